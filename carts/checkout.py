@@ -0,0 +1,101 @@
+from functools import partial
+
+from django.db import transaction
+from rest_framework import serializers
+
+from orders.checkout import place_order
+from products.models import Product
+from .store import CartLine
+
+
+class PriceChanged(Exception):
+    """Raised by checkout_cart when prices moved since the customer last viewed the cart."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        super().__init__("Prices changed since the cart was last viewed.")
+
+
+def price_lines(lines):
+    """
+    Resolve {product_id: CartLine} against the catalogue with one query.
+
+    Returns (products, rows): the products found by id, and one row per
+    line with the current unit price, availability and any problems.
+    """
+    products = Product.objects.only('id', 'name', 'price', 'stock', 'reserved', 'supplier_id').in_bulk(lines)
+    rows = []
+    for product_id, line in lines.items():
+        product = products.get(product_id)
+        if product is None:
+            rows.append({
+                'product': product_id, 'quantity': line.quantity,
+                'errors': ["This product is no longer available."],
+            })
+            continue
+        errors = []
+        if product.available < line.quantity:
+            errors.append(f"Only {max(product.available, 0)} in stock.")
+        rows.append({
+            'product': product_id,
+            'name': product.name,
+            'quantity': line.quantity,
+            'unit_price': product.price,
+            'subtotal': product.price * line.quantity,
+            'available': product.available,
+            'price_changed': line.price is not None and line.price != product.price,
+            'errors': errors,
+        })
+    return products, rows
+
+
+def view_cart(store, user_id):
+    """
+    Price the customer's cart and remember the prices shown, so checkout
+    can tell whether they changed since. Returns the cart representation.
+    """
+    lines = store.load(user_id)
+    products, rows = price_lines(lines)
+    seen = {
+        product_id: CartLine(line.quantity, products[product_id].price if product_id in products else line.price)
+        for product_id, line in lines.items()
+    }
+    if seen != lines:
+        store.save(user_id, seen)
+    return {
+        'items': rows,
+        'total': sum(row['subtotal'] for row in rows if 'subtotal' in row),
+        'valid': bool(rows) and not any(row['errors'] for row in rows),
+    }
+
+
+def checkout_cart(store, customer):
+    """
+    Turn the customer's cart into an order and empty the cart once the
+    order commits, so a rolled-back checkout keeps the cart.
+
+    Raises ValidationError if the cart is empty or holds products that no
+    longer exist, and PriceChanged (after recording the new prices as seen)
+    if any price moved since the cart was last viewed. Stock is checked
+    atomically by place_order.
+    """
+    lines = store.load(customer.pk)
+    if not lines:
+        raise serializers.ValidationError({'items': ["Your cart is empty."]})
+    products, rows = price_lines(lines)
+    missing = [row for row in rows if row['product'] not in products]
+    if missing:
+        raise serializers.ValidationError({'items': [
+            {'product': row['product'], 'errors': row['errors']} for row in missing
+        ]})
+    if any(row['price_changed'] for row in rows):
+        store.save(customer.pk, {
+            product_id: CartLine(line.quantity, products[product_id].price) for product_id, line in lines.items()
+        })
+        raise PriceChanged(rows)
+
+    order = place_order(customer, [
+        {'product': products[product_id], 'quantity': line.quantity} for product_id, line in lines.items()
+    ])
+    transaction.on_commit(partial(store.clear, customer.pk))
+    return order
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+
+class CartItemSerializer(serializers.Serializer):
+    # Not checked against the catalogue here: edits never touch the database
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=1000)
+
+
+class CartQuantitySerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=0, max_value=1000)
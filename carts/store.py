@@ -0,0 +1,102 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULTS = {
+    'TTL': 7 * 24 * 60 * 60,  # seconds since the cart was last changed
+    'CACHE_ALIAS': 'default',
+}
+
+# price is the unit price the customer was last shown, or None if the cart
+# has not been viewed since the line was added
+CartLine = namedtuple('CartLine', ['quantity', 'price'])
+
+
+def encode_lines(lines):
+    """{product_id: CartLine} -> "12x3@19.99,45x1", one short token per line."""
+    return ','.join(
+        f'{product_id}x{line.quantity}' + (f'@{line.price}' if line.price is not None else '')
+        for product_id, line in lines.items()
+    )
+
+
+def decode_lines(value):
+    lines = {}
+    for token in filter(None, (value or '').split(',')):
+        head, _, price = token.partition('@')
+        product_id, _, quantity = head.partition('x')
+        lines[int(product_id)] = CartLine(int(quantity), Decimal(price) if price else None)
+    return lines
+
+
+class CartStore:
+    """
+    Carts kept in a Django cache, one compact string per customer, so adding
+    and removing lines never touches the database. A cart expires TTL
+    seconds after its last change.
+
+    Writes are read-modify-write on a single key; concurrent edits by the
+    same customer can lose one of them, which is acceptable for a cart.
+    """
+    key_prefix = 'cart:'
+
+    def __init__(self, ttl=DEFAULTS['TTL'], cache_alias=DEFAULTS['CACHE_ALIAS']):
+        self.ttl = ttl
+        self.cache = caches[cache_alias]
+
+    def _key(self, user_id):
+        return f'{self.key_prefix}{user_id}'
+
+    def load(self, user_id):
+        return decode_lines(self.cache.get(self._key(user_id)))
+
+    def save(self, user_id, lines):
+        if lines:
+            self.cache.set(self._key(user_id), encode_lines(lines), self.ttl)
+        else:
+            self.clear(user_id)
+        return lines
+
+    def clear(self, user_id):
+        self.cache.delete(self._key(user_id))
+
+    def add(self, user_id, product_id, quantity):
+        """Add quantity units of a product, on top of any already in the cart."""
+        lines = self.load(user_id)
+        line = lines.pop(product_id, CartLine(0, None))
+        lines[product_id] = CartLine(line.quantity + quantity, line.price)
+        return self.save(user_id, lines)
+
+    def set_quantity(self, user_id, product_id, quantity):
+        """Set a line's quantity; zero removes it."""
+        lines = self.load(user_id)
+        if quantity:
+            lines[product_id] = CartLine(quantity, lines[product_id].price if product_id in lines else None)
+        else:
+            lines.pop(product_id, None)
+        return self.save(user_id, lines)
+
+    def remove(self, user_id, product_id):
+        return self.set_quantity(user_id, product_id, 0)
+
+
+_cart_store = None
+
+
+def get_cart_store():
+    global _cart_store
+    if _cart_store is None:
+        options = {**DEFAULTS, **getattr(settings, 'CART_STORE', {})}
+        _cart_store = CartStore(ttl=options['TTL'], cache_alias=options['CACHE_ALIAS'])
+    return _cart_store
+
+
+@receiver(setting_changed)
+def reset_cart_store(setting, **kwargs):
+    global _cart_store
+    if setting == 'CART_STORE':
+        _cart_store = None
@@ -0,0 +1,114 @@
+# carts/tests.py
+from decimal import Decimal
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from ecommerce.testing import QueryBudgetMixin
+from orders.models import Order
+from products.models import Product, Category
+from .store import CartLine, decode_lines, encode_lines, get_cart_store
+
+User = get_user_model()
+
+class CartEncodingTestCase(SimpleTestCase):
+    """Test the compact per-line cart encoding"""
+
+    def test_round_trip(self):
+        lines = {12: CartLine(3, Decimal('19.99')), 45: CartLine(1, None)}
+        self.assertEqual(encode_lines(lines), '12x3@19.99,45x1')
+        self.assertEqual(decode_lines(encode_lines(lines)), lines)
+        self.assertEqual(decode_lines(None), {})
+
+class CartAPITestCase(QueryBudgetMixin, APITestCase):
+    """Test the cache-backed cart API and checkout"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        self.phone = Product.objects.create(name='Phone', category=category, price=300, stock=5, supplier=self.supplier)
+        self.case = Product.objects.create(name='Case', category=category, price=20, stock=50, supplier=self.supplier)
+        get_cart_store().clear(self.customer.pk)
+        self.client.force_authenticate(user=self.customer)
+
+    def test_edits_do_not_touch_the_database(self):
+        with self.assertQueryBudget(0):
+            self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 1})
+            self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 1})
+            self.client.post('/carts/items/', {'product': self.case.id, 'quantity': 4})
+            response = self.client.put(f'/carts/items/{self.case.id}/', {'quantity': 2})
+        self.assertEqual(response.data['items'], [
+            {'product': self.phone.id, 'quantity': 2}, {'product': self.case.id, 'quantity': 2},
+        ])
+        with self.assertQueryBudget(0):
+            response = self.client.delete(f'/carts/items/{self.case.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(get_cart_store().load(self.customer.pk), {self.phone.id: CartLine(2, None)})
+
+    def test_view_prices_lines_in_one_query(self):
+        self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 6})
+        self.client.post('/carts/items/', {'product': self.case.id, 'quantity': 2})
+        self.client.post('/carts/items/', {'product': 9999, 'quantity': 1})
+        with self.assertQueryBudget(1):
+            response = self.client.get('/carts/')
+        phone, case, missing = response.data['items']
+        self.assertEqual(phone['errors'], ["Only 5 in stock."])
+        self.assertEqual(case['subtotal'], 40)
+        self.assertEqual(missing['errors'], ["This product is no longer available."])
+        self.assertEqual(response.data['total'], 1840)
+        self.assertFalse(response.data['valid'])
+
+    def test_checkout_places_order_and_empties_cart(self):
+        self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 2})
+        self.client.post('/carts/items/', {'product': self.case.id, 'quantity': 3})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/carts/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total_price, 660)
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.stock, 3)
+        self.assertEqual(get_cart_store().load(self.customer.pk), {})
+        response = self.client.post('/carts/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checkout_confirms_price_changes(self):
+        self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 1})
+        self.client.get('/carts/')
+        Product.objects.filter(pk=self.phone.pk).update(price=350)
+
+        response = self.client.post('/carts/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertTrue(response.data['items'][0]['price_changed'])
+        self.assertFalse(Order.objects.exists())
+        response = self.client.post('/carts/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.get().total_price, 350)
+
+    def test_rolled_back_checkout_keeps_cart(self):
+        from django.db import transaction
+        from .checkout import checkout_cart
+
+        self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    checkout_cart(get_cart_store(), self.customer)
+                    raise RuntimeError  # e.g. storing the idempotent response failed
+            except RuntimeError:
+                pass
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(get_cart_store().load(self.customer.pk), {self.phone.id: CartLine(2, None)})
+
+    def test_insufficient_stock_keeps_cart(self):
+        self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 6})
+        response = self.client.post('/carts/checkout/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('items', response.data)
+        self.assertEqual(get_cart_store().load(self.customer.pk), {self.phone.id: CartLine(6, None)})
+
+    def test_only_customers_have_a_cart(self):
+        self.client.force_authenticate(user=self.supplier)
+        response = self.client.post('/carts/items/', {'product': self.phone.id, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
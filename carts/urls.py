@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import CartView, CartItemListView, CartItemDetailView, CartCheckoutView
+
+urlpatterns = [
+    path('', CartView.as_view(), name='cart'),
+    path('items/', CartItemListView.as_view(), name='cart-items'),
+    path('items/<int:product_id>/', CartItemDetailView.as_view(), name='cart-item-detail'),
+    path('checkout/', CartCheckoutView.as_view(), name='cart-checkout'),
+]
@@ -0,0 +1,92 @@
+from functools import partial
+from rest_framework import permissions, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from orders import idempotency
+from orders.serializers import OrderSerializer
+from .checkout import PriceChanged, checkout_cart, view_cart
+from .serializers import CartItemSerializer, CartQuantitySerializer
+from .store import get_cart_store
+
+
+def lines_response(lines, status_code=status.HTTP_200_OK):
+    return Response(
+        {'items': [{'product': product_id, 'quantity': line.quantity} for product_id, line in lines.items()]},
+        status=status_code
+    )
+
+
+class CustomerCartView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.role != 'customer':
+            raise PermissionDenied("Only customers have a cart.")
+        self.store = get_cart_store()
+
+
+class CartView(CustomerCartView):
+    """
+    View the cart priced against the catalogue (one query), or empty it.
+    """
+
+    def get(self, request):
+        return Response(view_cart(self.store, request.user.pk))
+
+    def delete(self, request):
+        self.store.clear(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartItemListView(CustomerCartView):
+    """
+    Add units of a product to the cart: {"product": id, "quantity": n}.
+    """
+
+    def post(self, request):
+        serializer = CartItemSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        lines = self.store.add(request.user.pk, data['product'], data['quantity'])
+        return lines_response(lines, status.HTTP_201_CREATED)
+
+
+class CartItemDetailView(CustomerCartView):
+    """
+    Change a line's quantity (0 removes it) or remove it.
+    """
+
+    def put(self, request, product_id):
+        serializer = CartQuantitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return lines_response(self.store.set_quantity(request.user.pk, product_id, serializer.validated_data['quantity']))
+
+    patch = put
+
+    def delete(self, request, product_id):
+        self.store.remove(request.user.pk, product_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartCheckoutView(CustomerCartView):
+    """
+    Place an order for everything in the cart. Answers 409 with the repriced
+    cart if prices changed since it was last viewed; posting again confirms.
+    """
+
+    def post(self, request):
+        key = request.headers.get(idempotency.HEADER)
+        if key:
+            return idempotency.idempotent_response(request, key, partial(self.checkout, request))
+        return self.checkout(request)
+
+    def checkout(self, request):
+        try:
+            order = checkout_cart(self.store, request.user)
+        except PriceChanged as e:
+            return Response(
+                {"detail": str(e), 'items': e.rows}, status=status.HTTP_409_CONFLICT
+            )
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
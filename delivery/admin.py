@@ -1,4 +1,24 @@
+from django import forms
 from django.contrib import admin
+from ecommerce.state_machine import TransitionNotAllowed
 from .models import Delivery
+from .transitions import DELIVERY_STATES
 
-admin.site.register(Delivery)
+class DeliveryAdminForm(forms.ModelForm):
+    class Meta:
+        model = Delivery
+        fields = '__all__'
+
+    def clean_status(self):
+        value = self.cleaned_data['status']
+        if not self.instance._state.adding and value != self.instance.status:
+            try:
+                DELIVERY_STATES.check(self.instance.status, value)
+            except TransitionNotAllowed as e:
+                raise forms.ValidationError(str(e))
+        return value
+
+class DeliveryAdmin(admin.ModelAdmin):
+    form = DeliveryAdminForm
+
+admin.site.register(Delivery, DeliveryAdmin)
@@ -0,0 +1,160 @@
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count
+
+from notifications.utils import buffered_notifications, bulk_notify_delivery_assign, notify_user
+from products import stats as supplier_stats
+from users.models import User
+from .models import Delivery
+
+# Seconds before the open-delivery counts are re-read from the database,
+# picking up assignments made by other processes
+REBUILD_INTERVAL = 300
+
+
+class Dispatcher:
+    """
+    Assigns orders to the active courier with the fewest open deliveries.
+
+    Open-delivery counts are kept in a min-heap of (count, courier_id),
+    built from Delivery on first use and updated as deliveries are assigned,
+    completed, reassigned or deleted, once the change commits, so
+    rolled-back work never counts. Updates push a fresh entry and leave the
+    old one behind; outdated entries are discarded when they reach the top,
+    so each assignment costs O(log n). Courier changes (new users,
+    deactivations, role changes) mark the heap for a rebuild.
+    """
+
+    def __init__(self, rebuild_interval=REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        self._loads = {}
+        self._heap = []
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Rebuild the counts from the database on next use."""
+        with self._lock:
+            self._built_at = None
+
+    def loads(self):
+        """Current {courier_id: open deliveries}, for monitoring and tests."""
+        with self._lock:
+            self._ensure_built()
+            return dict(self._loads)
+
+    def _ensure_built(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.rebuild_interval:
+            return
+        loads = dict.fromkeys(User.objects.filter(role='delivery', is_active=True).values_list('pk', flat=True), 0)
+        open_deliveries = (
+            Delivery.objects.exclude(status='delivered')
+            .values_list('delivery_person')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for courier_id, count in open_deliveries:
+            if courier_id in loads:
+                loads[courier_id] = count
+        self._loads = loads
+        self._heap = [(count, courier_id) for courier_id, count in loads.items()]
+        heapq.heapify(self._heap)
+        self._built_at = time.monotonic()
+
+    def _take(self):
+        """Pop the least-loaded courier and count one more delivery against them."""
+        while self._heap:
+            load, courier_id = self._heap[0]
+            if self._loads.get(courier_id) == load:
+                heapq.heapreplace(self._heap, (load + 1, courier_id))
+                self._loads[courier_id] = load + 1
+                return courier_id
+            heapq.heappop(self._heap)  # outdated entry
+        return None
+
+    def _choose(self, count):
+        """
+        Pick couriers for count deliveries, least-loaded first, and hand the
+        picks back: they are counted by record_assigned once the deliveries
+        commit.
+        """
+        chosen = [self._take() for _ in range(count)]
+        for courier_id, taken in Counter(chosen).items():
+            self._loads[courier_id] -= taken
+            heapq.heappush(self._heap, (self._loads[courier_id], courier_id))
+        return chosen
+
+    def _adjust(self, deltas):
+        with self._lock:
+            if self._built_at is None:
+                return
+            for courier_id, delta in deltas.items():
+                if courier_id not in self._loads:
+                    continue
+                load = max(self._loads[courier_id] + delta, 0)
+                self._loads[courier_id] = load
+                heapq.heappush(self._heap, (load, courier_id))
+
+    def _record(self, courier_ids, delta):
+        deltas = Counter()
+        for courier_id in courier_ids:
+            deltas[courier_id] += delta
+        if deltas:
+            transaction.on_commit(partial(self._adjust, deltas))
+
+    def record_assigned(self, courier_ids):
+        """Count a new open delivery per id in courier_ids when the current transaction commits."""
+        self._record(courier_ids, 1)
+
+    def record_released(self, courier_ids):
+        """Count one open delivery less per id in courier_ids when the current transaction commits."""
+        self._record(courier_ids, -1)
+
+    def assign(self, order):
+        """Create a delivery for order with the least-loaded courier, or return None if there is none."""
+        deliveries = self.assign_many([order])
+        return deliveries[0] if deliveries else None
+
+    def assign_many(self, orders):
+        """
+        Create deliveries for orders (none of which may have one yet), spread
+        across couriers by load, with one INSERT and one notification per courier.
+        """
+        orders = list(orders)
+        if not orders:
+            return []
+        with self._lock:
+            self._ensure_built()
+            if not self._loads:
+                return []
+            couriers = self._choose(len(orders))
+
+        deliveries = Delivery.objects.bulk_create([
+            Delivery(order=order, delivery_person_id=courier_id)
+            for order, courier_id in zip(orders, couriers)
+        ])
+        supplier_stats.record_delivery_statuses(deliveries, new_status='assigned')
+        self.record_assigned(couriers)
+
+        by_courier = defaultdict(list)
+        for delivery in deliveries:
+            by_courier[delivery.delivery_person_id].append(delivery)
+        people = User.objects.in_bulk(by_courier)
+        with buffered_notifications():
+            for courier_id, assigned in by_courier.items():
+                if len(assigned) == 1:
+                    notify_user(
+                        people[courier_id], f"New delivery assigned: Order #{assigned[0].order_id}",
+                        notif_type="delivery"
+                    )
+                else:
+                    bulk_notify_delivery_assign(people[courier_id], assigned)
+        return deliveries
+
+
+dispatcher = Dispatcher()
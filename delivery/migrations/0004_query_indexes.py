@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0003_alter_delivery_options'),
+        ('orders', '0004_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['delivery_person', '-id'], name='delivery_person_id_idx'),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
+from ecommerce.versioning import VersionedMixin
 from users.models import User
 from orders.models import Order
 
-class Delivery(models.Model):
+class Delivery(VersionedMixin, models.Model):
     STATUS_CHOICES = [
         ('assigned', 'Assigned'),
         ('picked', 'Picked'),
@@ -14,9 +15,13 @@ class Delivery(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='assigned')
     assigned_at = models.DateTimeField(auto_now_add=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=1)
     
     class Meta:
         ordering = ['-assigned_at']
+        indexes = [
+            models.Index(fields=['delivery_person', '-id'], name='delivery_person_id_idx'),
+        ]
 
     def __str__(self):
-        return f"Delivery for Order #{self.order.id} - {self.status}"
\ No newline at end of file
+        return f"Delivery for Order #{self.order_id} - {self.status}"
\ No newline at end of file
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import Delivery
 from orders.models import Order
 from users.models import User
+from ecommerce.state_machine import TransitionNotAllowed
+from .transitions import DELIVERY_STATES
 
 class DeliverySerializer(serializers.ModelSerializer):
     order_id = serializers.IntegerField(source='order.id', read_only=True)
@@ -13,5 +15,13 @@ class DeliverySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Delivery
-        fields = ['id', 'order', 'delivery_person', 'status', 'assigned_at', 'delivered_at', 'order_id', 'delivery_person_name']
-        read_only_fields = ['id', 'assigned_at', 'delivered_at']
\ No newline at end of file
+        fields = ['id', 'order', 'delivery_person', 'status', 'assigned_at', 'delivered_at', 'order_id', 'delivery_person_name', 'version']
+        read_only_fields = ['id', 'assigned_at', 'delivered_at', 'version']
+
+    def validate_status(self, value):
+        if self.instance is not None and value != self.instance.status:
+            try:
+                DELIVERY_STATES.check(self.instance.status, value)
+            except TransitionNotAllowed as e:
+                raise serializers.ValidationError(str(e))
+        return value
@@ -1,16 +1,17 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from delivery.models import Delivery
 from notifications.utils import notify_user
-from orders.utils import send_delivery_status_email
+from products import stats as supplier_stats
+from users.models import User
+from .dispatch import dispatcher
+from . import transitions  # registers the DELIVERY_STATES hooks
 
 @receiver(post_save, sender=Delivery)
 def handle_delivery_notifications(sender, instance, created, **kwargs):
     """
-    Consolidated signal handler for delivery notifications:
-    - Notifies delivery person on assignment
-    - Notifies customer on status changes
-    - Sends email updates
+    Notifies the delivery person on assignment; status change notifications
+    are DELIVERY_STATES hooks in delivery.transitions
     """
     if created:
         # Notify delivery person about new assignment
@@ -19,17 +20,29 @@ def handle_delivery_notifications(sender, instance, created, **kwargs):
             f"New delivery assigned: Order #{instance.order.id}", 
             notif_type="delivery"
         )
-    
-    else:
-        # Notify customer about important status changes
-        if instance.status in ['picked', 'in_transit', 'delivered']:
-            status_display = instance.get_status_display()
-            notify_user(
-                instance.order.customer,
-                f"Your order #{instance.order.id} is now {status_display}.",
-                notif_type="delivery"
-            )
-        
-        # Send email for major status updates
-        if instance.status in ['shipped', 'delivered']:
-            send_delivery_status_email(instance)
\ No newline at end of file
+
+@receiver(pre_delete, sender=Delivery)
+def remove_delivery_from_supplier_stats(sender, instance, **kwargs):
+    # pre_delete: the order's items may be gone by post_delete on a cascade
+    supplier_stats.record_delivery_status(instance, old_status=instance.status)
+
+@receiver(post_save, sender=Delivery)
+def rebalance_reassigned_delivery(sender, instance, created, **kwargs):
+    """
+    Move an open delivery's load to its new courier
+    """
+    if not created and instance.status != 'delivered' and instance.has_changed('delivery_person'):
+        dispatcher.record_released([instance.previous_value('delivery_person')])
+        dispatcher.record_assigned([instance.delivery_person_id])
+
+@receiver(post_delete, sender=Delivery)
+def release_deleted_delivery(sender, instance, **kwargs):
+    if instance.status != 'delivered':
+        dispatcher.record_released([instance.delivery_person_id])
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_dispatcher_couriers(sender, update_fields=None, **kwargs):
+    # Couriers may have joined, left or been deactivated; last_login bumps can't change that
+    if update_fields is None or {'role', 'is_active'} & set(update_fields):
+        dispatcher.invalidate()
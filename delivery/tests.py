@@ -3,6 +3,7 @@ from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from ecommerce.testing import QueryBudgetMixin, QueryPlanMixin
 from products.models import Product, Category
 from orders.models import Order
 from .models import Delivery
@@ -145,4 +146,206 @@ class DeliverySignalsTestCase(TestCase):
         # Check if notification was created for delivery person
         notifications = Notification.objects.filter(user=self.delivery_person)
         self.assertEqual(notifications.count(), 1)
-        self.assertIn('New delivery assigned', notifications.first().message)
\ No newline at end of file
+        self.assertIn('New delivery assigned', notifications.first().message)
+
+class DeliveryStateMachineTestCase(APITestCase):
+    """Test delivery status transitions and their hooks"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.delivery_person = User.objects.create_user(username='delivery', password='delivery123', role='delivery')
+        self.order = Order.objects.create(customer=self.customer, total_price=100)
+        self.delivery = Delivery.objects.create(order=self.order, delivery_person=self.delivery_person)
+        self.client.force_authenticate(user=self.delivery_person)
+
+    def test_status_cannot_move_backwards(self):
+        Delivery.objects.filter(pk=self.delivery.pk).update(status='in_transit')
+        response = self.client.patch(f'/delivery/{self.delivery.id}/', {'status': 'picked'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('status', response.data)
+
+    def test_customer_notified_after_commit(self):
+        from notifications.models import Notification
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/delivery/{self.delivery.id}/', {'status': 'picked'})
+            self.assertFalse(Notification.objects.filter(user=self.customer, type='delivery').exists())
+        self.assertEqual(
+            Notification.objects.get(user=self.customer, type='delivery').message,
+            f'Your order #{self.order.id} is now Picked.'
+        )
+
+    def test_bulk_transition_batches_side_effects(self):
+        from notifications.models import Notification, OutboundEmail
+        from .transitions import DELIVERY_STATES
+
+        self.customer.email = 'customer@example.com'
+        self.customer.save()
+        for _ in range(2):
+            order = Order.objects.create(customer=self.customer, total_price=100)
+            Delivery.objects.create(order=order, delivery_person=self.delivery_person)
+        OutboundEmail.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            moved = DELIVERY_STATES.bulk_transition(Delivery.objects.select_related('order__customer'), 'delivered')
+        self.assertEqual(len(moved), 3)
+        self.assertEqual(len(callbacks), 2)  # one per on_commit hook, not per delivery
+        self.assertEqual(Delivery.objects.filter(status='delivered', delivered_at__isnull=False).count(), 3)
+        self.assertEqual(Notification.objects.filter(user=self.customer, type='delivery').count(), 3)
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+    def test_stale_if_match_is_rejected(self):
+        response = self.client.patch(f'/delivery/{self.delivery.id}/', {'status': 'picked'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response['ETag'], '"2"')
+        response = self.client.patch(f'/delivery/{self.delivery.id}/', {'status': 'in_transit'}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, 'picked')
+
+class DeliveryAdminTestCase(TestCase):
+    """Test status changes made through the admin"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='admin123')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.delivery_person = User.objects.create_user(username='delivery', password='delivery123', role='delivery')
+        order = Order.objects.create(customer=self.customer, total_price=100)
+        self.delivery = Delivery.objects.create(order=order, delivery_person=self.delivery_person, status='in_transit')
+        self.client.force_login(self.admin)
+
+    def change(self, status):
+        return self.client.post(f'/admin/delivery/delivery/{self.delivery.pk}/change/', {
+            'order': self.delivery.order_id, 'delivery_person': self.delivery_person.pk,
+            'status': status, 'version': self.delivery.version,
+        })
+
+    def test_backwards_move_is_a_form_error(self):
+        response = self.change('picked')
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context['adminform'].form, 'status', 'Cannot change status from in_transit to picked.'
+        )
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, 'in_transit')
+
+    def test_forward_move_is_saved(self):
+        response = self.change('delivered')
+        self.assertEqual(response.status_code, 302)
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, 'delivered')
+
+class DispatcherTestCase(TestCase):
+    """Test least-loaded courier assignment"""
+
+    def setUp(self):
+        from .dispatch import dispatcher
+
+        self.dispatcher = dispatcher
+        self.dispatcher.invalidate()
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.busy = User.objects.create_user(username='busy', password='delivery123', role='delivery')
+        self.idle = User.objects.create_user(username='idle', password='delivery123', role='delivery')
+        for _ in range(2):
+            order = Order.objects.create(customer=self.customer, total_price=100)
+            Delivery.objects.create(order=order, delivery_person=self.busy)
+
+    def new_orders(self, count):
+        return [Order.objects.create(customer=self.customer, total_price=100) for _ in range(count)]
+
+    def test_assign_many_balances_load(self):
+        from notifications.models import Notification
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deliveries = self.dispatcher.assign_many(self.new_orders(4))
+        self.assertEqual(len(deliveries), 4)
+        self.assertEqual(self.dispatcher.loads(), {self.busy.id: 3, self.idle.id: 3})
+        self.assertEqual(Delivery.objects.filter(delivery_person=self.idle).count(), 3)
+        self.assertEqual(
+            Notification.objects.get(user=self.idle).message, 'You have 3 new deliveries assigned.'
+        )
+
+    def test_completed_deliveries_free_the_courier(self):
+        from .transitions import DELIVERY_STATES
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dispatcher.assign_many(self.new_orders(2))  # both to idle: 2 and 2
+        with self.captureOnCommitCallbacks(execute=True):
+            DELIVERY_STATES.bulk_transition(Delivery.objects.filter(delivery_person=self.busy), 'delivered')
+        delivery = self.dispatcher.assign(self.new_orders(1)[0])
+        self.assertEqual(delivery.delivery_person_id, self.busy.id)
+
+    def test_rolled_back_assignments_are_not_counted(self):
+        from django.db import transaction
+
+        self.dispatcher.loads()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.dispatcher.assign_many(self.new_orders(2))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.dispatcher.loads(), {self.busy.id: 2, self.idle.id: 0})
+        self.assertFalse(Delivery.objects.filter(delivery_person=self.idle).exists())
+
+    def test_cancelled_orders_release_their_courier(self):
+        from orders.transitions import ORDER_STATES
+
+        order = self.new_orders(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            ORDER_STATES.transition(order, 'confirmed')
+        self.assertEqual(self.dispatcher.loads()[self.idle.id], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ORDER_STATES.transition(order, 'cancelled')
+        self.assertFalse(Delivery.objects.filter(order=order).exists())
+        self.assertEqual(self.dispatcher.loads(), {self.busy.id: 2, self.idle.id: 0})
+
+    def test_inactive_couriers_are_skipped(self):
+        self.dispatcher.loads()
+        self.idle.is_active = False
+        self.idle.save()
+        delivery = self.dispatcher.assign(self.new_orders(1)[0])
+        self.assertEqual(delivery.delivery_person_id, self.busy.id)
+
+class DeliveryQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Test delivery endpoints run a fixed number of queries regardless of size"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(username='admin', password='admin123')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.delivery_person = User.objects.create_user(username='delivery', password='delivery123', role='delivery')
+        for _ in range(10):
+            order = Order.objects.create(customer=self.customer, total_price=100)
+            self.delivery = Delivery.objects.create(order=order, delivery_person=self.delivery_person)
+        self.new_order = Order.objects.create(customer=self.customer, total_price=100)
+    
+    def test_delivery_list_budget(self):
+        self.client.force_authenticate(user=self.delivery_person)
+        with self.assertQueryBudget(2):
+            response = self.client.get('/delivery/')
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_delivery_update_budget(self):
+        self.client.force_authenticate(user=self.delivery_person)
+        with self.assertQueryBudget(5):
+            response = self.client.patch(f'/delivery/{self.delivery.id}/', {'status': 'in_transit'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_delivery_create_budget(self):
+        self.client.force_authenticate(user=self.admin)
+        data = {'order': self.new_order.id, 'delivery_person': self.delivery_person.id}
+        with self.assertQueryBudget(6):
+            response = self.client.post('/delivery/create/', data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class DeliveryQueryPlanTestCase(QueryPlanMixin, TestCase):
+    """Courier delivery lists are answered from an index"""
+
+    def test_delivery_person_list_uses_index(self):
+        from .views import DeliveryListView
+
+        courier = User.objects.create_user(username='delivery', password='delivery123', role='delivery')
+        self.assertUsesIndex(self.list_queryset(DeliveryListView, courier), 'delivery_person_id_idx')
@@ -0,0 +1,59 @@
+from django.db.models import prefetch_related_objects
+
+from ecommerce.state_machine import StateMachine
+from notifications.utils import buffered_notifications, notify_user
+from orders.utils import send_delivery_status_emails
+from products import stats as supplier_stats
+from .dispatch import dispatcher
+from .models import Delivery
+
+# Deliveries only move forward; stages may be skipped
+DELIVERY_STATES = StateMachine(Delivery, 'status', {
+    'assigned': ['picked', 'in_transit', 'delivered'],
+    'picked': ['in_transit', 'delivered'],
+    'in_transit': ['delivered'],
+}, timestamps={'delivered': 'delivered_at'})
+
+
+@DELIVERY_STATES.hook(on_commit=False)
+def update_supplier_delivery_stats(deliveries, source, target):
+    supplier_stats.record_delivery_statuses(deliveries, old_status=source, new_status=target)
+
+
+@DELIVERY_STATES.hook('delivered', on_commit=False)
+def email_delivered_customers(deliveries, source, target):
+    # The outbox row is written with the transaction; the worker sends it after commit
+    if source is not None:
+        prefetch_related_objects(deliveries, 'order__customer')
+        send_delivery_status_emails(deliveries)
+
+
+@DELIVERY_STATES.hook('picked', 'in_transit', 'delivered')
+def notify_customers(deliveries, source, target):
+    """Tell customers their order moved, with one bulk insert per batch"""
+    if source is None:
+        return
+    prefetch_related_objects(deliveries, 'order__customer')
+    status_display = dict(Delivery.STATUS_CHOICES)[target]
+    with buffered_notifications():
+        for delivery in deliveries:
+            notify_user(
+                delivery.order.customer,
+                f"Your order #{delivery.order.id} is now {status_display}.",
+                notif_type="delivery"
+            )
+
+
+# The dispatcher applies load changes itself once the transaction commits
+
+@DELIVERY_STATES.hook('delivered', on_commit=False)
+def release_couriers(deliveries, source, target):
+    if source is not None:
+        dispatcher.record_released(delivery.delivery_person_id for delivery in deliveries)
+
+
+@DELIVERY_STATES.hook('assigned', 'picked', 'in_transit', on_commit=False)
+def count_manual_assignments(deliveries, source, target):
+    # Deliveries created outside the dispatcher (admin API, shell)
+    if source is None:
+        dispatcher.record_assigned(delivery.delivery_person_id for delivery in deliveries)
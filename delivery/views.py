@@ -1,44 +1,49 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from ecommerce.versioning import ConditionalUpdateMixin
 from .models import Delivery
 from .serializers import DeliverySerializer
-from django.utils import timezone
+from .transitions import DELIVERY_STATES
 
 class DeliveryListView(generics.ListAPIView):
     """
     List all deliveries assigned to the logged-in delivery personnel.
     """
     serializer_class = DeliverySerializer
+    queryset = Delivery.objects.select_related('order', 'delivery_person')
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.role == "delivery":
-            return Delivery.objects.filter(delivery_person=user).order_by('-id')
+            return queryset.filter(delivery_person=user).order_by('-id')
         elif user.role == "admin":
-            return Delivery.objects.all()
+            return queryset
         return Delivery.objects.none()
 
-class DeliveryUpdateView(generics.UpdateAPIView):
+class DeliveryUpdateView(ConditionalUpdateMixin, generics.UpdateAPIView):
     """
     Update delivery status (delivery personnel only).
     """
     serializer_class = DeliverySerializer
-    queryset = Delivery.objects.all().order_by('-id')
+    queryset = Delivery.objects.select_related('order__customer', 'delivery_person').order_by('-id')
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
+        queryset = super().get_queryset()
         if user.role == "delivery":
-            return Delivery.objects.filter(delivery_person=user)
+            return queryset.filter(delivery_person=user)
         elif user.role == "admin":
-            return Delivery.objects.all()
+            return queryset
         return Delivery.objects.none()
     
     def perform_update(self, serializer):
-        # Automatically set delivered_at timestamp if status is 'delivered'
-        if 'status' in serializer.validated_data and serializer.validated_data['status'] == 'delivered':
-            serializer.validated_data['delivered_at'] = timezone.now()
+        # Stamp fields such as delivered_at when the status actually changes
+        new_status = serializer.validated_data.get('status', serializer.instance.status)
+        if new_status != serializer.instance.status:
+            serializer.validated_data.update(DELIVERY_STATES.entry_values(new_status))
         
         serializer.save()
 
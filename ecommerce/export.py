@@ -0,0 +1,74 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+# Rows fetched from the database cursor at a time
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object handing csv.writer output straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Text such as product names is user-written; keep it from running as a formula
+        return "'" + value
+    return value
+
+
+def _csv_lines(fields, records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for record in records:
+        yield writer.writerow([_csv_cell(record[field]) for field in fields])
+
+
+def _jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def chunked_rows(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream queryset.values_list(*fields) as lists of up to chunk_size tuples,
+    so callers can fetch related rows once per chunk instead of per row.
+    """
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def export_response(request, filename, fields, records):
+    """
+    Stream records (an iterable of dicts keyed by fields) as CSV or JSON
+    Lines, chosen by ?export_format=csv|jsonl (default csv). Nested lists
+    are JSON-encoded in CSV cells and text cells that would start a
+    spreadsheet formula are prefixed with a quote.
+    """
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in CONTENT_TYPES:
+        raise serializers.ValidationError({'export_format': [f"Choose one of: {', '.join(CONTENT_TYPES)}."]})
+    lines = _csv_lines(fields, records) if export_format == 'csv' else _jsonl_lines(records)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
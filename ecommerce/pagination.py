@@ -0,0 +1,75 @@
+from rest_framework import filters, serializers
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    CursorPagination that always walks its own ordering. The stock class
+    defers to the view's OrderingFilter, whose fields need not be unique.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Sending ``?cursor=`` (empty for the first page) switches the request to
+    cursor pagination: no COUNT(*) and no OFFSET scan, so page 10,000 costs
+    the same as page 1. The keyset defaults to ``cursor_ordering`` and can be
+    overridden per view with a ``cursor_ordering`` attribute; the primary key
+    breaks ties so pages never skip or repeat rows. Cursor mode cannot be
+    combined with ``?ordering=`` or ``?search=``, whose orders it would
+    replace.
+    """
+    cursor_query_param = 'cursor'
+    cursor_ordering = '-id'
+
+    def get_cursor_paginator(self, view=None):
+        paginator = KeysetPagination()
+        paginator.page_size = self.page_size
+        paginator.cursor_query_param = self.cursor_query_param
+        ordering = getattr(view, 'cursor_ordering', self.cursor_ordering)
+        if ordering.lstrip('-') in ('id', 'pk'):
+            paginator.ordering = (ordering,)
+        else:
+            paginator.ordering = (ordering, '-pk' if ordering.startswith('-') else 'pk')
+        return paginator
+
+    def check_cursor_params(self, request, view):
+        """Reject ordering and search parameters the keyset would silently override."""
+        conflicts = []
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, filters.OrderingFilter):
+                conflicts.append(backend.ordering_param)
+            elif issubclass(backend, filters.SearchFilter):
+                conflicts.append(backend.search_param)
+        used = [param for param in conflicts if request.query_params.get(param)]
+        if used:
+            raise serializers.ValidationError({self.cursor_query_param: [
+                f"Cursor pagination cannot be combined with {', '.join(used)}; use page numbers instead."
+            ]})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.check_cursor_params(request, view)
+            self.cursor_paginator = self.get_cursor_paginator(view)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        cursor_parameters = self.get_cursor_paginator(view).get_schema_operation_parameters(view)
+        return super().get_schema_operation_parameters(view) + cursor_parameters
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'orders',
     'delivery',
     'notifications',
+    'carts',
     
     # Third-party apps
     'rest_framework',
@@ -62,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'notifications.middleware.NotificationBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'ecommerce.urls'
@@ -138,7 +140,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 
@@ -147,12 +149,34 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "ecommerce.pagination.HybridPagination",
     "PAGE_SIZE": 10,
 
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Token -> user lookups cached by users.authentication.CachedTokenAuthentication
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,  # seconds
+    'LOCAL_TTL': 5,  # seconds a process trusts its in-memory copy; bounds staleness in other workers
+    'CACHE_ALIAS': None,  # set to a shared cache (e.g. 'default') for multi-process deployments
+}
+
+# Seconds an Idempotency-Key response is kept for replay (POST /orders/)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Seconds stock reserved through /products/reservations/ is held before the
+# release_expired_reservations sweeper gives it back
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Carts live only in this cache until checkout and expire TTL seconds after
+# their last change; use a shared cache (e.g. Redis) for multi-process deployments
+CART_STORE = {
+    'TTL': 7 * 24 * 60 * 60,  # seconds
+    'CACHE_ALIAS': 'default',
+}
+
 # Email Configuration
 DEFAULT_FROM_EMAIL = 'noreply@ecommerce.com'
 # For development - emails print to console
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .versioning import VersionedMixin, next_version
+
+
+class TransitionNotAllowed(Exception):
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        super().__init__(f"Cannot change status from {source} to {target}.")
+
+
+class StateMachine:
+    """
+    Declares the allowed transitions of a model's status field and the hooks
+    run when instances move between states.
+
+    Hooks are called as hook(instances, source, target) once per batch:
+    on_commit hooks (notifications and the like) after the transaction
+    commits, the others (bookkeeping that must stay consistent with the
+    row) immediately. Plain saves are checked against the transitions in
+    pre_save and run the hooks through post_save, so the model must use
+    ChangeTrackingMixin; bulk_transition runs them itself.
+    """
+
+    def __init__(self, model, field, transitions, timestamps=None):
+        self.model = model
+        self.field = field
+        self.transitions = {source: frozenset(targets) for source, targets in transitions.items()}
+        # {target: field} set to the current time when entering target
+        self.timestamps = timestamps or {}
+        self._hooks = []
+        pre_save.connect(self._saving, sender=model, dispatch_uid=f'state_machine:{model._meta.label}')
+        post_save.connect(self._saved, sender=model, dispatch_uid=f'state_machine:{model._meta.label}')
+
+    def can_transition(self, source, target):
+        return target in self.transitions.get(source, ())
+
+    def check(self, source, target):
+        if not self.can_transition(source, target):
+            raise TransitionNotAllowed(source, target)
+
+    def entry_values(self, target):
+        """Extra field values to write when entering target, e.g. a delivered_at timestamp."""
+        field = self.timestamps.get(target)
+        return {field: timezone.now()} if field else {}
+
+    def hook(self, *targets, source=None, on_commit=True):
+        """Register a hook for transitions into any of targets and/or out of source (default: any)."""
+        def decorator(func):
+            self._hooks.append((frozenset(targets), source, on_commit, func))
+            return func
+        return decorator
+
+    def run_hooks(self, instances, source, target):
+        for hook_targets, hook_source, on_commit, func in self._hooks:
+            if (hook_targets and target not in hook_targets) or hook_source not in (None, source):
+                continue
+            if on_commit:
+                transaction.on_commit(partial(func, instances, source, target))
+            else:
+                func(instances, source, target)
+
+    def transition(self, instance, target):
+        """Validate and save a single transition; the hooks run via post_save."""
+        self.check(getattr(instance, self.field), target)
+        setattr(instance, self.field, target)
+        for field, value in self.entry_values(target).items():
+            setattr(instance, field, value)
+        instance.save()
+        return instance
+
+    def bulk_transition(self, queryset, target):
+        """
+        Move every row of queryset that may enter target with one UPDATE per
+        source state, then run the hooks once per source. Rows that cannot
+        make the transition, or that left their source state between the read
+        and the UPDATE, are left alone. Returns the moved instances.
+        """
+        sources = [source for source, targets in self.transitions.items() if target in targets]
+        values = {self.field: target, **self.entry_values(target)}
+        now = timezone.now()
+        for field in self.model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                values[field.attname] = now
+
+        with transaction.atomic(using=queryset.db):
+            by_source = defaultdict(list)
+            for instance in queryset.filter(**{f'{self.field}__in': sources}).select_for_update():
+                by_source[getattr(instance, self.field)].append(instance)
+
+            versioned = issubclass(self.model, VersionedMixin)
+            manager = self.model._base_manager.using(queryset.db)
+            moved = []
+            for source, instances in by_source.items():
+                instances = self._update(
+                    manager, instances, source, {**values, **({'version': next_version()} if versioned else {})}
+                )
+                if not instances:
+                    continue
+                for instance in instances:
+                    for field, value in values.items():
+                        setattr(instance, field, value)
+                    if versioned:
+                        instance.version += 1
+                    instance.reset_changes([*values, 'version'])
+                self.run_hooks(instances, source, target)
+                moved.extend(instances)
+        return moved
+
+    def _update(self, manager, instances, source, values):
+        """
+        UPDATE the instances still in source and return the ones it matched.
+
+        select_for_update() is a no-op on some backends (SQLite), so rows may
+        have moved on since they were read. The usual all-matched case is one
+        statement; otherwise it is rolled back and retried row by row.
+        """
+        savepoint = transaction.savepoint(using=manager.db)
+        matched = manager.filter(pk__in=[instance.pk for instance in instances], **{self.field: source}).update(**values)
+        if matched == len(instances):
+            return instances
+        transaction.savepoint_rollback(savepoint, using=manager.db)
+        return [
+            instance for instance in instances
+            if manager.filter(pk=instance.pk, **{self.field: source}).update(**values)
+        ]
+
+    def _saving(self, sender, instance, raw=False, **kwargs):
+        # Unsaved and untracked instances have no known source state to check
+        if raw or instance._state.adding or not instance._is_tracked():
+            return
+        source, target = instance.previous_value(self.field), getattr(instance, self.field)
+        if source != target:
+            self.check(source, target)
+
+    def _saved(self, sender, instance, created, raw=False, **kwargs):
+        if raw:
+            return
+        if created:
+            self.run_hooks([instance], None, getattr(instance, self.field))
+        elif instance.has_changed(self.field):
+            self.run_hooks([instance], instance.previous_value(self.field), getattr(instance, self.field))
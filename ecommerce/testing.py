@@ -0,0 +1,68 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class QueryBudgetMixin:
+    """
+    Test mixin asserting an upper bound on the queries a block may run.
+
+    Unlike assertNumQueries the budget is a ceiling, so it only fails when a
+    change makes an endpoint more expensive, e.g. by reintroducing an N+1.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f'{executed} queries executed, budget is {budget}\nCaptured queries were:\n{queries}')
+
+
+class QueryPlanMixin:
+    """
+    Test mixin asserting a queryset is answered through an index.
+
+    Runs EXPLAIN QUERY PLAN (SQLite) and fails on any full table scan; a
+    scan that walks an index or the rowid in order is accepted. Take the
+    queryset from the code that runs it, e.g. list_queryset() for a view,
+    so the test follows the view when its query changes.
+    """
+
+    def make_view(self, view_class, user, query=None, **kwargs):
+        """An instance of view_class set up for a GET by user with query parameters."""
+        request = APIRequestFactory().get('/', query or {})
+        force_authenticate(request, user=user)
+        view = view_class()
+        view.setup(request, **kwargs)
+        view.request = view.initialize_request(request, **kwargs)
+        view.format_kwarg = None
+        return view
+
+    def list_queryset(self, view_class, user, query=None, **kwargs):
+        """The first page a list view would query for user: its filtered queryset, sliced."""
+        view = self.make_view(view_class, user, query, **kwargs)
+        return view.filter_queryset(view.get_queryset())[:view.paginator.page_size]
+
+    def get_query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index_name=None):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN checks are SQLite specific')
+        plan = self.get_query_plan(queryset)
+        full_scans = [step for step in plan if step.startswith('SCAN') and ' USING ' not in step]
+        if full_scans:
+            self.fail(f'Full table scan in query plan: {plan}')
+        if index_name is not None and not any(index_name in step for step in plan):
+            self.fail(f'{index_name} not used by query plan: {plan}')
+        return plan
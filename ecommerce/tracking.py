@@ -0,0 +1,78 @@
+class ChangeTrackingMixin:
+    """
+    Model mixin remembering the field values an instance was loaded (or last
+    saved) with, so code can ask what changed without re-reading the row.
+
+    save() on a tracked instance writes only the changed columns (plus
+    auto_now fields) and is a no-op when nothing changed. The snapshot is
+    reset after the save completes, so post_save handlers still see the old
+    values through has_changed() and previous_value().
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _attname(self, field_name):
+        return self._meta.get_field(field_name).attname
+
+    def _is_tracked(self):
+        return getattr(self, '_loaded_values', None) is not None
+
+    def has_changed(self, field_name):
+        """True if the field differs from its stored value; always True for unsaved instances."""
+        if not self._is_tracked():
+            return True
+        attname = self._attname(field_name)
+        if attname not in self.__dict__:
+            return False  # deferred and never assigned
+        return attname not in self._loaded_values or self._loaded_values[attname] != self.__dict__[attname]
+
+    def changed_fields(self):
+        """Names of the concrete fields that differ from their stored values."""
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and self.has_changed(field.name)
+        ]
+
+    def previous_value(self, field_name):
+        """The stored value of a field, or None for unsaved instances."""
+        if not self._is_tracked():
+            return None
+        attname = self._attname(field_name)
+        return self._loaded_values.get(attname, self.__dict__.get(attname))
+
+    def reset_changes(self, field_names=None):
+        """Treat the current values (of field_names, or all fields) as the stored ones."""
+        values = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in self.__dict__:
+                continue
+            if field_names is None or field.name in field_names or field.attname in field_names:
+                values[field.attname] = self.__dict__[field.attname]
+        self._loaded_values = values
+
+    def save(self, *args, **kwargs):
+        if (
+            self._is_tracked()
+            and not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not args
+        ):
+            changed = self.changed_fields()
+            if changed:
+                changed += [
+                    field.name for field in self._meta.concrete_fields
+                    if getattr(field, 'auto_now', False) and field.name not in changed
+                ]
+            kwargs['update_fields'] = changed
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self.reset_changes(None if update_fields is None else set(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self.reset_changes(None if fields is None else set(fields))
@@ -4,6 +4,7 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, Spec
 
 urlpatterns = [
     path('admin/', admin.site.urls),    
+    path('carts/', include("carts.urls")),
     path('delivery/', include("delivery.urls")),
     path('notifications/', include("notifications.urls")),
     path('orders/', include("orders.urls")),
@@ -0,0 +1,92 @@
+from django.db.models import F
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .tracking import ChangeTrackingMixin
+
+
+class ConcurrentUpdateError(Exception):
+    def __init__(self, instance):
+        self.instance = instance
+        super().__init__(
+            f"{instance._meta.verbose_name.capitalize()} {instance.pk} was changed by someone else "
+            f"since version {instance.version} was read."
+        )
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource was modified since you last read it; fetch it again and retry."
+    default_code = 'precondition_failed'
+
+
+def next_version():
+    """Expression for queryset.update() calls, which must bump the version themselves."""
+    return F('version') + 1
+
+
+class VersionedMixin(ChangeTrackingMixin):
+    """
+    Optimistic concurrency for models with a ``version`` column.
+
+    Every save of an existing row is an ``UPDATE ... WHERE version = n`` that
+    also sets version to n + 1. If another writer got there first no row
+    matches and ConcurrentUpdateError is raised instead of silently
+    overwriting their change. Bulk queryset updates bypass save() and must
+    set ``version=next_version()``.
+    """
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if not values:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        field = self._meta.get_field('version')
+        expected = self.version
+        values = [value for value in values if value[0] is not field] + [(field, None, expected + 1)]
+        if base_qs.filter(pk=pk_val, version=expected)._update(values):
+            self.version = expected + 1
+            self.reset_changes(['version'])
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise ConcurrentUpdateError(self)
+        return False
+
+
+class ConditionalUpdateMixin:
+    """
+    View mixin for detail endpoints of VersionedMixin models: responses carry
+    an ETag of the row version, and writes sent with If-Match are refused
+    with 412 unless it still matches. Writes without If-Match are still
+    conditional on the version the view read, so they cannot overwrite a
+    concurrent change either.
+    """
+
+    @staticmethod
+    def etag(instance):
+        return f'"{instance.version}"'
+
+    def check_precondition(self, instance):
+        header = self.request.headers.get('If-Match')
+        if header is None:
+            return
+        tags = {tag.strip() for tag in header.split(',')}
+        if '*' not in tags and self.etag(instance) not in tags:
+            raise PreconditionFailed()
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            self.check_precondition(instance)
+        self._etag_instance = instance
+        return instance
+
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except ConcurrentUpdateError:
+            raise PreconditionFailed()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        instance = getattr(self, '_etag_instance', None)
+        if instance is not None and status.is_success(response.status_code) and request.method != 'DELETE':
+            response['ETag'] = self.etag(instance)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,6 +1,14 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, OutboundEmail
 
-admin.site.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'type', 'is_read', 'created_at',)
+    list_select_related = ('user',)
 
+admin.site.register(Notification, NotificationAdmin)
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at',)
+    list_filter = ('status',)
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
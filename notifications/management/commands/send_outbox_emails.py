@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications import outbox
+
+class Command(BaseCommand):
+    help = 'Delivers queued outbox emails in batches over a reused mail connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.DEFAULT_BATCH_SIZE, help='Emails sent per connection')
+        parser.add_argument('--max-attempts', type=int, default=outbox.DEFAULT_MAX_ATTEMPTS, help='Attempts before an email is dead-lettered')
+        parser.add_argument('--backoff', type=int, default=outbox.DEFAULT_BACKOFF_SECONDS, help='Base retry delay in seconds, doubled per attempt')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails instead of exiting once drained')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls with --loop')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'dead': 0}
+        while True:
+            result = outbox.deliver_outbox(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                backoff_seconds=options['backoff'],
+            )
+            for key, value in result.items():
+                totals[key] += value
+            if sum(result.values()) >= options['batch_size']:
+                continue  # Full batch, more may be due
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {totals['sent']} sent, {totals['retried']} scheduled for retry, {totals['dead']} dead-lettered"
+        ))
@@ -0,0 +1,15 @@
+from .utils import buffered_notifications
+
+
+class NotificationBufferMiddleware:
+    """
+    Collect the notifications created while handling a request and write
+    them with one bulk_create once the response is ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_notifications():
+            return self.get_response(request)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 class Notification(models.Model):
@@ -11,5 +12,45 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     type = models.CharField(max_length=50, default="general") # e.g. 'order', 'delivery', 'system'
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notif_user_created_idx'),
+            models.Index(
+                fields=['user', '-created_at'], condition=models.Q(is_read=False), name='notif_user_unread_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Notification for {self.user.username}: {self.message[:30]}"
+
+class OutboundEmail(models.Model):
+    """
+    Transactional email outbox. Rows are written in the same transaction as
+    the change that triggers them and delivered by the send_outbox_emails worker.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    # Set by the worker that claimed the row; next_attempt_at is then its lease expiry
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
     def __str__(self):
-        return f"Notification for {self.user.username}: {self.message[:30]}"
\ No newline at end of file
+        return f"Email to {', '.join(self.recipients)}: {self.subject[:30]} ({self.status})"
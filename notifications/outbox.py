@@ -0,0 +1,136 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 60
+# A claimed batch left in 'sending' (e.g. by a crashed worker) is due again after this
+DEFAULT_CLAIM_SECONDS = 600
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    """
+    Queue an email for the outbox worker.
+
+    Call this inside the transaction that triggers the email: if it rolls
+    back, the email is never sent. Returns None when there is no recipient.
+    """
+    recipients = [address for address in recipient_list if address]
+    if not recipients:
+        return None
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=recipients,
+    )
+
+
+def enqueue_emails(messages):
+    """Queue many (subject, message, recipient_list) tuples with one INSERT."""
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=subject,
+            body=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipients=[address for address in recipient_list if address],
+        )
+        for subject, message, recipient_list in messages
+        if any(recipient_list)
+    ])
+
+
+def retry_delay(attempts, backoff_seconds=DEFAULT_BACKOFF_SECONDS):
+    """Exponential backoff: backoff, 2x backoff, 4x backoff, ..."""
+    return timedelta(seconds=backoff_seconds * 2 ** (attempts - 1))
+
+
+def _error(e):
+    return f"{type(e).__name__}: {e}"
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE, claim_seconds=DEFAULT_CLAIM_SECONDS):
+    """
+    Claim up to batch_size due emails for this worker and return them.
+
+    One conditional UPDATE moves due rows to 'sending' under a fresh claim
+    token, so concurrent workers never pick up the same row. The claim
+    lasts claim_seconds; rows still 'sending' after that are due again.
+    """
+    now = timezone.now()
+    token = uuid.uuid4()
+    due = OutboundEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+    due.filter(
+        pk__in=due.order_by('next_attempt_at', 'id').values('pk')[:batch_size]
+    ).update(status='sending', claim_token=token, next_attempt_at=now + timedelta(seconds=claim_seconds))
+    return list(OutboundEmail.objects.filter(claim_token=token).order_by('next_attempt_at', 'id'))
+
+
+def deliver_outbox(batch_size=DEFAULT_BATCH_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                   backoff_seconds=DEFAULT_BACKOFF_SECONDS, connection=None, claim_seconds=DEFAULT_CLAIM_SECONDS):
+    """
+    Claim and send one batch of due emails over a single mail connection.
+
+    Each message is sent individually on the shared connection so one bad
+    address cannot fail the batch; if the connection cannot be opened the
+    whole batch fails. Failures are retried with exponential backoff and
+    dead-lettered after max_attempts. Returns a dict of counts.
+    """
+    batch = claim_batch(batch_size, claim_seconds)
+    result = {'sent': 0, 'retried': 0, 'dead': 0}
+    if not batch:
+        return result
+
+    connection = connection or get_connection()
+    sent_ids = []
+    failed = []
+    try:
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            email.last_error = _error(e)
+        failed = batch
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.recipients, connection=connection
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    email.last_error = _error(e)
+                    failed.append(email)
+                else:
+                    sent_ids.append(email.pk)
+        finally:
+            connection.close()
+
+    finished_at = timezone.now()
+    if sent_ids:
+        OutboundEmail.objects.filter(pk__in=sent_ids).update(
+            status='sent', sent_at=finished_at, last_error='', claim_token=None
+        )
+    for email in failed:
+        email.attempts += 1
+        email.claim_token = None
+        if email.attempts >= max_attempts:
+            email.status = 'dead'
+            result['dead'] += 1
+        else:
+            email.status = 'pending'
+            email.next_attempt_at = finished_at + retry_delay(email.attempts, backoff_seconds)
+            result['retried'] += 1
+    if failed:
+        OutboundEmail.objects.bulk_update(
+            failed, ['attempts', 'status', 'next_attempt_at', 'last_error', 'claim_token']
+        )
+
+    result['sent'] = len(sent_ids)
+    return result
@@ -1,9 +1,18 @@
 # notifications/tests.py
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from .models import Notification
+from ecommerce.testing import QueryBudgetMixin, QueryPlanMixin
+from .models import Notification, OutboundEmail
+from .outbox import claim_batch, deliver_outbox, enqueue_email
 
 User = get_user_model()
 
@@ -62,6 +71,42 @@ class NotificationAPITestCase(APITestCase):
         self.assertEqual(response.data['results'][0]['id'], self.notification2.id)
         self.assertEqual(response.data['results'][1]['id'], self.notification1.id)
     
+    def test_list_unread_notifications(self):
+        """Test ?is_read=false lists only unread notifications"""
+        Notification.objects.filter(pk=self.notification2.pk).update(is_read=True)
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get('/notifications/?is_read=false')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['id'] for n in response.data['results']], [self.notification1.id])
+    
+    def test_list_notifications_with_cursor(self):
+        """Test cursor mode keeps newest-first ordering without a count"""
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get('/notifications/?cursor=')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(
+            [n['id'] for n in response.data['results']],
+            [self.notification2.id, self.notification1.id]
+        )
+    
+    def test_cursor_pages_break_timestamp_ties_by_id(self):
+        """Test rows sharing a created_at are neither skipped nor repeated across pages"""
+        for i in range(13):
+            Notification.objects.create(user=self.user1, message=f'Bulk {i}', type='system')
+        Notification.objects.filter(user=self.user1).update(created_at=timezone.now())
+        self.client.force_authenticate(user=self.user1)
+
+        seen = []
+        url = '/notifications/?cursor='
+        while url:
+            response = self.client.get(url)
+            seen += [n['id'] for n in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(Notification.objects.filter(user=self.user1).values_list('id', flat=True), reverse=True))
+    
     def test_list_notifications_unauthenticated(self):
         """Test unauthenticated user cannot access notifications"""
         response = self.client.get('/notifications/')
@@ -120,4 +165,222 @@ class NotificationUtilsTestCase(TestCase):
         notification = Notification.objects.filter(user=self.delivery_user).first()
         self.assertIsNotNone(notification)
         self.assertIn(f'{delivery_count} new deliveries', notification.message)
-        self.assertEqual(notification.type, 'delivery')
\ No newline at end of file
+        self.assertEqual(notification.type, 'delivery')
+
+class BufferedNotificationTestCase(TestCase):
+    """Test write-behind buffering of notifications"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='test123', role='customer')
+        self.courier = User.objects.create_user(username='delivery', password='test123', role='delivery')
+    
+    def test_buffered_block_writes_once(self):
+        from .utils import buffered_notifications, notify_user, bulk_notify_delivery_assign
+        
+        with self.assertNumQueries(1):
+            with buffered_notifications():
+                for i in range(5):
+                    notify_user(self.user, f'Message {i}', 'order')
+                bulk_notify_delivery_assign(self.courier, range(3))
+                with buffered_notifications():
+                    notify_user(self.user, 'Nested', 'order')
+        
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(Notification.objects.filter(user=self.courier).count(), 1)
+    
+    def test_failed_block_drops_its_notifications(self):
+        from .utils import buffered_notifications, notify_user
+        
+        with buffered_notifications():
+            notify_user(self.user, 'Kept')
+            with self.assertRaises(ValueError):
+                with buffered_notifications():
+                    notify_user(self.user, 'Dropped')
+                    raise ValueError
+        
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)), ['Kept'])
+    
+    def test_process_buffer_flushes_by_size_and_age(self):
+        from .utils import enable_process_buffer, disable_process_buffer, notify_user
+        
+        buffer = enable_process_buffer(max_size=3, max_age=60)
+        self.addCleanup(disable_process_buffer)
+        notify_user(self.user, 'One')
+        notify_user(self.user, 'Two')
+        self.assertEqual(Notification.objects.count(), 0)
+        notify_user(self.user, 'Three')
+        self.assertEqual(Notification.objects.count(), 3)
+        
+        notify_user(self.user, 'Four')
+        buffer.max_age = 0
+        self.assertEqual(buffer.flush_if_due(), 1)
+        self.assertEqual(Notification.objects.count(), 4)
+    
+    def test_request_notifications_are_flushed(self):
+        from products.models import Product, Category
+        
+        supplier = User.objects.create_user(username='supplier', password='test123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        product = Product.objects.create(name='Laptop', category=category, price=100, stock=10, supplier=supplier)
+        
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.post('/orders/', {'items': [{'product': product.id, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Notification.objects.filter(user=self.user, message__contains='has been placed').exists())
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """Locmem backend that rejects one address and counts opened connections"""
+    opened = 0
+    
+    def open(self):
+        FlakyEmailBackend.opened += 1
+        return super().open()
+    
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@example.com' in message.to:
+                raise SMTPRecipientsRefused({'bounce@example.com': (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+class DownEmailBackend(locmem.EmailBackend):
+    """Locmem backend whose server refuses connections"""
+    
+    def open(self):
+        raise ConnectionRefusedError(111, 'Connection refused')
+
+
+@override_settings(EMAIL_BACKEND='notifications.tests.FlakyEmailBackend')
+class EmailOutboxTestCase(TestCase):
+    """Test the transactional email outbox and its worker"""
+    
+    def setUp(self):
+        from products.models import Product, Category
+        
+        FlakyEmailBackend.opened = 0
+        self.customer = User.objects.create_user(
+            username='customer', password='customer123', role='customer', email='customer@example.com'
+        )
+        supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(name='Laptop', category=category, price=100, stock=10, supplier=supplier)
+    
+    def test_order_email_is_queued_not_sent(self):
+        from orders.checkout import place_order
+        
+        order = place_order(self.customer, [{'product': self.product, 'quantity': 1}])
+        
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.recipients, ['customer@example.com'])
+        self.assertIn(f'#{order.id}', email.subject)
+        self.assertIn('$100', email.body)
+    
+    def test_worker_sends_batch_over_one_connection(self):
+        for i in range(3):
+            enqueue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'])
+        
+        call_command('send_outbox_emails', stdout=StringIO())
+        
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 3)
+    
+    def test_failures_back_off_then_dead_letter(self):
+        enqueue_email('Bounces', 'Body', ['bounce@example.com'])
+        good = enqueue_email('Works', 'Body', ['ok@example.com'])
+        
+        result = deliver_outbox(max_attempts=2, backoff_seconds=60)
+        self.assertEqual(result, {'sent': 1, 'retried': 1, 'dead': 0})
+        good.refresh_from_db()
+        self.assertEqual(good.status, 'sent')
+        
+        bounced = OutboundEmail.objects.get(subject='Bounces')
+        self.assertEqual(bounced.attempts, 1)
+        self.assertIn('SMTPRecipientsRefused', bounced.last_error)
+        self.assertGreater(bounced.next_attempt_at, timezone.now() + timedelta(seconds=50))
+        
+        # Not due yet
+        self.assertEqual(deliver_outbox(max_attempts=2), {'sent': 0, 'retried': 0, 'dead': 0})
+        
+        OutboundEmail.objects.filter(pk=bounced.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(max_attempts=2), {'sent': 0, 'retried': 0, 'dead': 1})
+        bounced.refresh_from_db()
+        self.assertEqual((bounced.status, bounced.attempts), ('dead', 2))
+    
+    def test_connection_failure_retries_whole_batch(self):
+        for i in range(2):
+            enqueue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'])
+        
+        result = deliver_outbox(max_attempts=2, connection=DownEmailBackend())
+        self.assertEqual(result, {'sent': 0, 'retried': 2, 'dead': 0})
+        for email in OutboundEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertIn('ConnectionRefusedError', email.last_error)
+        
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        result = deliver_outbox(max_attempts=2, connection=DownEmailBackend())
+        self.assertEqual(result, {'sent': 0, 'retried': 0, 'dead': 2})
+    
+    def test_claimed_emails_are_not_sent_twice(self):
+        for i in range(3):
+            enqueue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'])
+        
+        claimed = claim_batch(batch_size=2)
+        self.assertEqual(len(claimed), 2)
+        self.assertTrue(all(email.status == 'sending' for email in claimed))
+        
+        # A second worker only gets what the first did not claim
+        self.assertEqual(deliver_outbox(), {'sent': 1, 'retried': 0, 'dead': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(deliver_outbox(), {'sent': 0, 'retried': 0, 'dead': 0})
+        
+        # An abandoned claim is due again once it lapses
+        OutboundEmail.objects.filter(status='sending').update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(), {'sent': 2, 'retried': 0, 'dead': 0})
+        self.assertFalse(OutboundEmail.objects.exclude(status='sent').exists())
+    
+    def test_email_without_recipient_is_skipped(self):
+        self.assertIsNone(enqueue_email('Nobody', 'Body', ['']))
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class NotificationQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Test notification endpoints run a fixed number of queries regardless of size"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='user', password='pass123', role='customer')
+        for i in range(10):
+            self.notification = Notification.objects.create(user=self.user, message=f'Message {i}')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_notification_list_budget(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get('/notifications/')
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_notification_mark_read_budget(self):
+        with self.assertQueryBudget(2):
+            response = self.client.patch(f'/notifications/{self.notification.id}/', {'is_read': True})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class NotificationQueryPlanTestCase(QueryPlanMixin, TestCase):
+    """Notification lists are answered from indexes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='test123', role='customer')
+
+    def test_list_uses_user_created_index(self):
+        from .views import NotificationListView
+
+        self.assertUsesIndex(self.list_queryset(NotificationListView, self.user), 'notif_user_created_idx')
+
+    def test_unread_list_uses_partial_index(self):
+        from .views import NotificationListView
+
+        queryset = self.list_queryset(NotificationListView, self.user, {'is_read': 'false'})
+        self.assertUsesIndex(queryset, 'notif_user_unread_idx')
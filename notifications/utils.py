@@ -1,9 +1,129 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
 from notifications.models import Notification
 from users.models import User
 
+_local = threading.local()
+_process_buffer = None
+
+
+class NotificationBuffer:
+    """
+    Collects Notification rows and writes them with a single bulk_create.
+
+    With max_size and/or max_age (seconds) set, the buffer flushes itself
+    once it holds that many rows or its oldest row is that old.
+    """
+
+    def __init__(self, max_size=None, max_age=None):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._pending = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, notification):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(notification)
+        self.flush_if_due()
+
+    def is_due(self):
+        if not self._pending:
+            return False
+        if self.max_size is not None and len(self._pending) >= self.max_size:
+            return True
+        return self.max_age is not None and time.monotonic() - self._oldest >= self.max_age
+
+    def flush_if_due(self):
+        if self.is_due():
+            return self.flush()
+        return 0
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            Notification.objects.bulk_create(pending)
+        return len(pending)
+
+    def truncate(self, size):
+        """Drop everything added after the buffer held ``size`` rows."""
+        with self._lock:
+            del self._pending[size:]
+
+
+@contextmanager
+def buffered_notifications():
+    """
+    Buffer notify_user calls made in this thread until the block exits, then
+    write them with one bulk_create.
+
+    Nested blocks join the outermost one, and notifications added by a
+    block that raises are dropped. Open it inside transaction.atomic() to
+    flush as part of the transaction.
+    """
+    outer = getattr(_local, 'buffer', None)
+    if outer is not None:
+        mark = len(outer)
+        try:
+            yield outer
+        except BaseException:
+            outer.truncate(mark)
+            raise
+        return
+
+    buffer = NotificationBuffer()
+    _local.buffer = buffer
+    try:
+        yield buffer
+    except BaseException:
+        buffer.truncate(0)
+        raise
+    finally:
+        _local.buffer = None
+    buffer.flush()
+
+
+def enable_process_buffer(max_size=500, max_age=5.0):
+    """
+    Buffer notifications process-wide, for worker processes. Flushes by
+    size or age, and on interpreter exit; call flush_if_due() from idle loops.
+    """
+    global _process_buffer
+    if _process_buffer is None:
+        _process_buffer = NotificationBuffer(max_size=max_size, max_age=max_age)
+        atexit.register(disable_process_buffer)
+    return _process_buffer
+
+
+def disable_process_buffer():
+    global _process_buffer
+    buffer, _process_buffer = _process_buffer, None
+    if buffer is not None:
+        buffer.flush()
+
+
+def _write(notification):
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _process_buffer
+    if buffer is None:
+        notification.save()
+    else:
+        buffer.add(notification)
+
+
 def notify_user(user, message, notif_type="general"):
-    Notification.objects.create(user=user, message=message, type=notif_type)
+    _write(Notification(user=user, message=message, type=notif_type))
 
 def bulk_notify_delivery_assign(delivery_person, deliveries):
     msg = f"You have {len(deliveries)} new deliveries assigned."
-    Notification.objects.create(user=delivery_person, message=msg, type="delivery")
\ No newline at end of file
+    _write(Notification(user=delivery_person, message=msg, type="delivery"))
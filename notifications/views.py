@@ -1,13 +1,17 @@
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions
 from .models import Notification
 from .serializers import NotificationSerializer
 
 class NotificationListView(generics.ListAPIView):
     """
-    List all notifications for the logged-in user.
+    List all notifications for the logged-in user; ?is_read=false for unread ones.
     """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['is_read']
+    cursor_ordering = '-created_at'
 
     def get_queryset(self):
         user = self.request.user
@@ -1,13 +1,38 @@
+from django import forms
 from django.contrib import admin
-from .models import Order, OrderItem
+from ecommerce.state_machine import TransitionNotAllowed
+from .models import IdempotencyKey, Order, OrderItem
+from .transitions import ORDER_STATES
+
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        value = self.cleaned_data['status']
+        if not self.instance._state.adding and value != self.instance.status:
+            try:
+                ORDER_STATES.check(self.instance.status, value)
+            except TransitionNotAllowed as e:
+                raise forms.ValidationError(str(e))
+        return value
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
 
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = ('id', 'customer', 'status', 'total_price', 'created_at',)
     inlines = [OrderItemInline]
 
 admin.site.register(Order, OrderAdmin)
-admin.site.register(OrderItem)
\ No newline at end of file
+admin.site.register(OrderItem)
+
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'status_code', 'created_at', 'expires_at')
+    list_select_related = ('user',)
+    search_fields = ('key',)
+
+admin.site.register(IdempotencyKey, IdempotencyKeyAdmin)
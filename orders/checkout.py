@@ -0,0 +1,121 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from ecommerce.versioning import next_version
+from notifications.utils import buffered_notifications
+from products import stats as supplier_stats
+from products import inventory, reservations
+from products.models import Product, StockReservation
+from . import rollups
+from .models import Order, OrderItem
+
+
+def _aggregate_quantities(items_data):
+    """Sum the requested quantity per product, keeping cart order."""
+    quantities = {}
+    for item_data in items_data:
+        product_id = item_data['product'].pk
+        quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+    return quantities
+
+
+def _decrement_stock(quantities, held):
+    """
+    Decrement stock for every product in one conditional UPDATE, consuming
+    the units the customer holds in reservations.
+
+    A product qualifies if its unreserved stock plus the customer's own hold
+    covers the quantity. Returns True only if every product qualified;
+    otherwise the rows that did match are rolled back to a savepoint, so
+    stock read afterwards in the same transaction is untouched. Must run
+    inside an atomic block.
+    """
+    has_stock = reduce(or_, (
+        Q(pk=pk, stock__gte=F('reserved') - held.get(pk, 0) + qty) for pk, qty in quantities.items()
+    ))
+    updates = {
+        'stock': Case(*[When(pk=pk, then=F('stock') - qty) for pk, qty in quantities.items()]),
+        'version': next_version(),
+        'stock_updated_at': timezone.now(),
+    }
+    if held:
+        updates['reserved'] = Case(*[When(pk=pk, then=F('reserved') - held.get(pk, 0)) for pk in quantities])
+    # Left open on success: the enclosing transaction's commit releases it
+    savepoint = transaction.savepoint()
+    if Product.objects.filter(has_stock).update(**updates) == len(quantities):
+        return True
+    transaction.savepoint_rollback(savepoint)
+    return False
+
+
+def _stock_errors(items_data, quantities, held):
+    """Build a per-item error list matching the shape of the submitted items."""
+    available = {
+        pk: stock - reserved + held.get(pk, 0)
+        for pk, stock, reserved in Product.objects.filter(pk__in=quantities).values_list('pk', 'stock', 'reserved')
+    }
+    errors = []
+    for item_data in items_data:
+        product = item_data['product']
+        if available.get(product.pk, 0) < quantities[product.pk]:
+            errors.append({
+                'quantity': [
+                    f"Insufficient stock for product: {product.name} "
+                    f"(available: {available.get(product.pk, 0)})"
+                ]
+            })
+        else:
+            errors.append({})
+    return errors
+
+
+def place_order(customer, items_data, **order_fields):
+    """
+    Create an order and its items in a single transaction.
+
+    Stock is checked and decremented with one conditional UPDATE, the order
+    is inserted once with its total already computed and the items are
+    written with one bulk_create. Stock the customer reserved for these
+    products is consumed and their reservations are released. If any
+    product is short on stock nothing is written and a per-item
+    ValidationError is raised.
+    """
+    if not items_data:
+        raise serializers.ValidationError({'items': ["An order must contain at least one item."]})
+
+    quantities = _aggregate_quantities(items_data)
+    total_price = sum(item['product'].price * item['quantity'] for item in items_data)
+
+    with transaction.atomic(), buffered_notifications():
+        holds = reservations.active_reservations(customer, quantities)
+        held = {}
+        for reservation in holds:
+            held[reservation.product_id] = held.get(reservation.product_id, 0) + reservation.quantity
+
+        if not _decrement_stock(quantities, held):
+            raise serializers.ValidationError({'items': _stock_errors(items_data, quantities, held)})
+        if holds:
+            StockReservation.objects.filter(pk__in=[reservation.pk for reservation in holds]).delete()
+        supplier_stats.refresh_product_counts({item['product'].supplier_id for item in items_data})
+
+        order = Order.objects.create(customer=customer, total_price=total_price, **order_fields)
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item['product'],
+                quantity=item['quantity'],
+                price=item['product'].price * item['quantity'],
+            )
+            for item in items_data
+        ])
+        rollups.record_order_items(order, items)
+        inventory.record_movements(
+            (product_id, 'sale', -quantity, f'order:{order.pk}') for product_id, quantity in quantities.items()
+        )
+
+    return order
@@ -0,0 +1,86 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+DEFAULT_TTL = 24 * 60 * 60  # seconds
+
+
+def request_fingerprint(request):
+    """Hash of what the request asks for, to catch a key reused for a different request."""
+    payload = json.dumps(
+        [request.method, request.path, request.data], sort_keys=True, cls=DjangoJSONEncoder
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {"detail": f"This {HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent_response(request, key, handler):
+    """
+    Run handler() once per (user, key) and replay its response to retries.
+
+    The key is claimed in the same transaction as the handler's writes, so a
+    concurrent retry waits on the unique constraint and then replays. Error
+    responses and exceptions roll the claim back and the client may retry.
+    """
+    if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+        return Response({"detail": f"{HEADER} is too long."}, status=status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    fingerprint = request_fingerprint(request)
+    keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+    record = keys.filter(expires_at__gt=now, status_code__isnull=False).first()
+    if record is not None:
+        return _replay(record, fingerprint)
+
+    ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+    with transaction.atomic():
+        keys.filter(expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=ttl),
+                )
+        except IntegrityError:
+            # A concurrent request with this key committed first
+            return _replay(keys.get(), fingerprint)
+
+        response = handler()
+        if status.is_success(response.status_code):
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+        else:
+            transaction.set_rollback(True)
+    return response
+
+
+def purge_expired_keys(batch_size=1000):
+    """Delete expired keys in batches; returns the number deleted."""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        batch = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
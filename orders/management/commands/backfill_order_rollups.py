@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from orders.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily order and product sales rollups from existing orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rollup rows inserted per batch')
+
+    def handle(self, *args, **options):
+        order_rows, product_rows = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully backfilled {order_rows} daily order rows and {product_rows} daily product rows'
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from orders.idempotency import purge_expired_keys
+
+class Command(BaseCommand):
+    help = 'Deletes expired Idempotency-Key records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per batch')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
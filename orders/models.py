@@ -1,8 +1,10 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from ecommerce.versioning import VersionedMixin
 from users.models import User
 from products.models import Product
 
-class Order(models.Model):
+class Order(VersionedMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('confirmed', 'Confirmed'),
@@ -15,23 +17,16 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', '-id'], name='order_customer_id_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} ({self.status})"
-    
-    # Add this method to Order model for automatic delivery creation
-    def save(self, *args, **kwargs):
-        """
-        Override save to trigger delivery creation when status changes to confirmed
-        """
-        if self.pk:  # Only for existing instances
-            old_status = Order.objects.get(pk=self.pk).status
-            if old_status != 'confirmed' and self.status == 'confirmed':
-                # This will trigger the signal to create delivery
-                super().save(*args, **kwargs)
-                return
-        
-        super().save(*args, **kwargs)
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -40,4 +35,62 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
-        return f"{self.product.name} x {self.quantity}"
\ No newline at end of file
+        return f"{self.product.name} x {self.quantity}"
+
+class DailyOrderStats(models.Model):
+    """
+    Order count and revenue per status per day of order creation.
+    Maintained incrementally by orders.rollups; rebuilt by backfill_order_rollups.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_order_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.order_count} orders"
+
+class DailyProductSales(models.Model):
+    """
+    Units sold and revenue per product per day of order creation.
+    Maintained incrementally by orders.rollups; rebuilt by backfill_order_rollups.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='unique_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} product #{self.product_id}: {self.units_sold} sold"
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a request sent with an Idempotency-Key header, replayed when
+    the client retries with the same key. Only successful responses are kept,
+    until expires_at; purge_idempotency_keys deletes expired rows.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # sha256 of method, path and body
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for user #{self.user_id}"
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyOrderStats, DailyProductSales, Order, OrderItem
+
+
+def _bump(model, lookup, **deltas):
+    """Add deltas to the rollup row identified by lookup, creating it if needed."""
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # A concurrent writer created the row first
+        model.objects.filter(**lookup).update(**updates)
+
+
+def _order_day(order):
+    return timezone.localdate(order.created_at)
+
+
+def record_order_created(order):
+    _bump(
+        DailyOrderStats, {'day': _order_day(order), 'status': order.status},
+        order_count=1, revenue=order.total_price,
+    )
+
+
+def record_order_deleted(order):
+    _bump(
+        DailyOrderStats, {'day': _order_day(order), 'status': order.status},
+        order_count=-1, revenue=-order.total_price,
+    )
+
+
+def record_status_change(order, old_status):
+    """Move an order's count and revenue from its old status bucket to the new one."""
+    record_status_changes([order], old_status, order.status)
+
+
+def record_status_changes(orders, old_status, new_status):
+    """Move many orders from one status bucket to another, one pair of writes per day."""
+    if old_status is None or old_status == new_status:
+        return
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for order in orders:
+        totals[_order_day(order)][0] += 1
+        totals[_order_day(order)][1] += order.total_price
+    for day, (count, revenue) in totals.items():
+        _bump(DailyOrderStats, {'day': day, 'status': old_status}, order_count=-count, revenue=-revenue)
+        _bump(DailyOrderStats, {'day': day, 'status': new_status}, order_count=count, revenue=revenue)
+
+
+def record_order_items(order, items, sign=1):
+    """Add (or with sign=-1 remove) the units and revenue of an order's items."""
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for item in items:
+        totals[item.product_id][0] += item.quantity
+        totals[item.product_id][1] += item.price
+
+    day = _order_day(order)
+    rows = DailyProductSales.objects.filter(day=day, product_id__in=totals)
+    existing = set(rows.values_list('product_id', flat=True))
+    if existing:
+        rows.filter(product_id__in=existing).update(
+            units_sold=Case(*[
+                When(product_id=pk, then=F('units_sold') + sign * totals[pk][0]) for pk in existing
+            ]),
+            revenue=Case(*[
+                When(product_id=pk, then=F('revenue') + sign * totals[pk][1]) for pk in existing
+            ], output_field=DecimalField()),
+        )
+
+    missing = [pk for pk in totals if pk not in existing]
+    if not missing or sign < 0:
+        # Nothing to subtract from; the rows went with their product
+        return
+    try:
+        with transaction.atomic():
+            DailyProductSales.objects.bulk_create([
+                DailyProductSales(day=day, product_id=pk, units_sold=sign * totals[pk][0], revenue=sign * totals[pk][1])
+                for pk in missing
+            ])
+    except IntegrityError:
+        # A concurrent writer created some of the rows first
+        for pk in missing:
+            _bump(
+                DailyProductSales, {'day': day, 'product_id': pk},
+                units_sold=sign * totals[pk][0], revenue=sign * totals[pk][1],
+            )
+
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute every rollup row from the orders table."""
+    with transaction.atomic():
+        DailyOrderStats.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+
+        order_rows = (
+            Order.objects.annotate(day=TruncDate('created_at'))
+            .values('day', 'status')
+            .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+            .order_by()
+        )
+        DailyOrderStats.objects.bulk_create(
+            (DailyOrderStats(**row) for row in order_rows.iterator()), batch_size=batch_size
+        )
+
+        item_rows = (
+            OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+            .values('day', 'product_id')
+            .annotate(units_sold=Sum('quantity'), revenue=Sum('price'))
+            .order_by()
+        )
+        DailyProductSales.objects.bulk_create(
+            (DailyProductSales(**row) for row in item_rows.iterator()), batch_size=batch_size
+        )
+
+    return DailyOrderStats.objects.count(), DailyProductSales.objects.count()
@@ -1,8 +1,29 @@
 from rest_framework import serializers
 from .models import Order, OrderItem
 from products.models import Product
+from .checkout import place_order
+
+class PreloadedProductField(serializers.PrimaryKeyRelatedField):
+    """
+    Product lookup that reads from the map OrderSerializer preloads in one
+    query, instead of running one SELECT per order line.
+    """
+    def to_internal_value(self, data):
+        products = self.context.get('preloaded_products')
+        if products is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            product = products.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product = PreloadedProductField(queryset=Product.objects.all())
     product_name = serializers.CharField(source='product.name', read_only=True)
 
     class Meta:
@@ -15,35 +36,25 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'customer', 'status', 'total_price', 'created_at', 'updated_at', 'items']
-        read_only_fields = ['status', 'total_price', 'created_at', 'updated_at']
+        fields = ['id', 'customer', 'status', 'total_price', 'created_at', 'updated_at', 'version', 'items']
+        read_only_fields = ['status', 'total_price', 'created_at', 'updated_at', 'version']
+
+    def to_internal_value(self, data):
+        # Resolve every product in the cart with a single query
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list):
+            product_ids = set()
+            for item in items:
+                try:
+                    product_ids.add(int(item.get('product')))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context['preloaded_products'] = Product.objects.in_bulk(product_ids)
+        return super().to_internal_value(data)
 
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-        total_price = 0
-        for item_data in items_data:
-            product = item_data['product']
-            quantity = item_data['quantity']
-
-            # Check for sufficient stock
-            if product.stock < quantity:
-                raise serializers.ValidationError(f"Insufficient stock for product: {product.name}")
-
-            # Calculate price and create OrderItem
-            price = product.price * quantity
-            OrderItem.objects.create(order=order, price=price, **item_data)
-
-            # Update product stock
-            product.stock -= quantity
-            product.save()
-
-            total_price += price
-
-        order.total_price = total_price
-        order.save()
-
-        return order
+        return place_order(items_data=items_data, **validated_data)
     
     def update(self, instance, validated_data):
         # Handle regular fields (status in this case)
@@ -54,4 +65,41 @@ class OrderSerializer(serializers.ModelSerializer):
         # But for now, we'll ignore nested writes on update since items are write_only
         # and typically order items shouldn't be modified after creation
         
-        return instance
\ No newline at end of file
+        return instance
+
+
+class OrderBulkFilterSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=False)
+    customer = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Provide at least one filter.")
+        return attrs
+
+
+class OrderBulkTransitionSerializer(serializers.Serializer):
+    """Target status plus either explicit order ids or a filter selecting the orders."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = OrderBulkFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+    filter_lookups = {
+        'status': 'status', 'customer': 'customer_id',
+        'created_after': 'created_at__gte', 'created_before': 'created_at__lt',
+    }
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError("Provide either ids or filter.")
+        return attrs
+
+    def select(self, queryset):
+        """Narrow queryset to the orders this request targets."""
+        if 'ids' in self.validated_data:
+            return queryset.filter(pk__in=self.validated_data['ids'])
+        return queryset.filter(**{
+            self.filter_lookups[key]: value for key, value in self.validated_data['filter'].items()
+        })
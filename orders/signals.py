@@ -1,10 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from orders.models import Order
+from orders.models import Order, OrderItem
+from . import rollups
+from . import transitions  # registers the ORDER_STATES hooks
 from notifications.utils import notify_user
 from .utils import send_order_confirmation_email
-from delivery.models import Delivery
-from users.models import User
+from products import stats as supplier_stats
 
 @receiver(post_save, sender=Order)
 def handle_order_creation_actions(sender, instance, created, **kwargs):
@@ -12,7 +13,6 @@ def handle_order_creation_actions(sender, instance, created, **kwargs):
     Consolidated signal handler for order creation:
     - Sends notification to customer
     - Sends confirmation email
-    - Creates delivery for confirmed orders
     """
     if created:
         # 1. Internal Notification
@@ -22,11 +22,32 @@ def handle_order_creation_actions(sender, instance, created, **kwargs):
         send_order_confirmation_email(instance)
 
 @receiver(post_save, sender=Order)
-def create_delivery_for_confirmed_orders(sender, instance, **kwargs):
+def update_order_rollups(sender, instance, created, **kwargs):
     """
-    Create delivery automatically when order status changes to 'confirmed'
+    Count new orders in the dashboard's daily rollups; status changes are
+    recorded by the ORDER_STATES hooks in orders.transitions
     """
-    if instance.status == 'confirmed' and not hasattr(instance, 'delivery'):
-        delivery_person = User.objects.filter(role='delivery', is_active=True).first()
-        if delivery_person:
-            Delivery.objects.create(order=instance, delivery_person=delivery_person)
\ No newline at end of file
+    if created:
+        rollups.record_order_created(instance)
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_rollups(sender, instance, **kwargs):
+    rollups.record_order_deleted(instance)
+
+@receiver(post_save, sender=OrderItem)
+def update_product_sales_rollups(sender, instance, created, **kwargs):
+    """
+    Count items saved one at a time; checkout's bulk_create records its own
+    """
+    if created:
+        rollups.record_order_items(instance.order, [instance])
+
+@receiver(post_delete, sender=OrderItem)
+def remove_item_from_rollups(sender, instance, **kwargs):
+    rollups.record_order_items(instance.order, [instance], sign=-1)
+
+@receiver(pre_delete, sender=Order)
+def remove_delivered_units(sender, instance, **kwargs):
+    # pre_delete: the order's items are still there to be counted
+    if instance.status == 'delivered':
+        supplier_stats.record_order_delivered(instance, sign=-1)
@@ -1,9 +1,13 @@
 # orders/tests.py
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from ecommerce.testing import QueryBudgetMixin, QueryPlanMixin
 from products.models import Product, Category
+from delivery.models import Delivery
 from .models import Order, OrderItem
 
 User = get_user_model()
@@ -90,6 +94,58 @@ class OrderAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('Insufficient stock', str(response.data))
     
+    def test_insufficient_stock_leaves_nothing_behind(self):
+        """Test a failed checkout writes no order and keeps stock intact"""
+        self.client.force_authenticate(user=self.customer)
+        order_data = {
+            'items': [
+                {'product': self.product1.id, 'quantity': 2},
+                {'product': self.product2.id, 'quantity': 4}  # Only 3 in stock
+            ]
+        }
+
+        response = self.client.post('/orders/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'][0], {})
+        self.assertIn('Insufficient stock', str(response.data['items'][1]))
+
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(OrderItem.objects.count(), 0)
+        self.product1.refresh_from_db()
+        self.product2.refresh_from_db()
+        self.assertEqual(self.product1.stock, 5)
+        self.assertEqual(self.product2.stock, 3)
+
+    def test_stock_errors_ignore_rolled_back_decrements(self):
+        """Test items in stock are not reported short because a sibling item failed"""
+        self.client.force_authenticate(user=self.customer)
+        order_data = {
+            'items': [
+                {'product': self.product1.id, 'quantity': 3},  # 5 in stock
+                {'product': self.product2.id, 'quantity': 4}  # Only 3 in stock
+            ]
+        }
+
+        response = self.client.post('/orders/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'][0], {})
+        self.assertIn('(available: 3)', str(response.data['items'][1]))
+
+    def test_repeated_product_lines_share_stock_check(self):
+        """Test quantities for the same product are checked together"""
+        self.client.force_authenticate(user=self.customer)
+        order_data = {
+            'items': [
+                {'product': self.product1.id, 'quantity': 3},
+                {'product': self.product1.id, 'quantity': 3}  # 6 in total, only 5 in stock
+            ]
+        }
+
+        response = self.client.post('/orders/', order_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.stock, 5)
+    
     def test_list_orders_as_customer(self):
         """Test customer can only see their own orders"""
         # Create orders for different customers
@@ -149,4 +205,386 @@ class OrderSignalsTestCase(TestCase):
         # Check if notification was created
         notifications = Notification.objects.filter(user=self.customer)
         self.assertEqual(notifications.count(), 1)
-        self.assertIn('has been placed', notifications.first().message)
\ No newline at end of file
+        self.assertIn('has been placed', notifications.first().message)
+
+class OrderChangeTrackingTestCase(TestCase):
+    """Test that orders track their own changes instead of re-reading the row"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        Order.objects.create(customer=self.customer, total_price=100)
+        self.order = Order.objects.get()
+
+    def test_changed_fields(self):
+        self.assertEqual(self.order.changed_fields(), [])
+        self.order.status = 'cancelled'
+        self.assertTrue(self.order.has_changed('status'))
+        self.assertFalse(self.order.has_changed('total_price'))
+        self.assertEqual(self.order.changed_fields(), ['status'])
+        self.assertEqual(self.order.previous_value('status'), 'pending')
+
+    def test_save_writes_only_changed_columns(self):
+        self.order.status = 'cancelled'
+        with CaptureQueriesContext(connection) as context:
+            self.order.save()
+        update = context.captured_queries[0]['sql']
+        self.assertTrue(update.startswith('UPDATE "orders_order" SET "status" = '))
+        self.assertNotIn('total_price', update)
+        self.assertFalse(self.order.has_changed('status'))
+        self.assertEqual(Order.objects.get().status, 'cancelled')
+
+    def test_unchanged_save_is_a_noop(self):
+        with self.assertNumQueries(0):
+            self.order.save()
+
+    def test_refresh_from_db_resets_snapshot(self):
+        Order.objects.filter(pk=self.order.pk).update(status='confirmed')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.previous_value('status'), 'confirmed')
+        self.assertEqual(self.order.changed_fields(), [])
+
+class OrderStateMachineTestCase(TestCase):
+    """Test order status transitions and their hooks"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.courier = User.objects.create_user(username='courier', password='courier123', role='delivery')
+        self.orders = [Order.objects.create(customer=self.customer, total_price=100) for _ in range(3)]
+
+    def test_transition_rejects_undeclared_moves(self):
+        from ecommerce.state_machine import TransitionNotAllowed
+        from .transitions import ORDER_STATES
+
+        with self.assertRaises(TransitionNotAllowed):
+            ORDER_STATES.transition(self.orders[0], 'delivered')
+        ORDER_STATES.transition(self.orders[0], 'confirmed')
+        self.assertTrue(Delivery.objects.filter(order=self.orders[0]).exists())
+
+    def test_save_rejects_undeclared_moves_without_running_hooks(self):
+        from ecommerce.state_machine import TransitionNotAllowed
+        from .models import DailyOrderStats
+
+        order = self.orders[0]
+        order.status = 'delivered'
+        with self.assertRaises(TransitionNotAllowed):
+            order.save()
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'pending')
+        self.assertFalse(DailyOrderStats.objects.filter(status='delivered', order_count__gt=0).exists())
+
+    def test_bulk_transition_skips_rows_changed_after_the_read(self):
+        from unittest import mock
+        from notifications.models import Notification
+        from .models import DailyOrderStats
+        from .transitions import ORDER_STATES
+
+        update = ORDER_STATES._update
+
+        def racing_update(manager, instances, source, values):
+            # Another request cancels an order between the SELECT and the UPDATE
+            Order.objects.filter(pk=self.orders[1].pk).update(status='cancelled')
+            return update(manager, instances, source, values)
+
+        with mock.patch.object(ORDER_STATES, '_update', side_effect=racing_update):
+            moved = ORDER_STATES.bulk_transition(Order.objects.all(), 'confirmed')
+
+        self.assertEqual(sorted(order.pk for order in moved), [self.orders[0].pk, self.orders[2].pk])
+        self.assertEqual(Order.objects.get(pk=self.orders[1].pk).status, 'cancelled')
+        self.assertEqual(DailyOrderStats.objects.get(status='confirmed').order_count, 2)
+        self.assertFalse(Delivery.objects.filter(order=self.orders[1]).exists())
+        self.assertEqual(
+            Notification.objects.get(user=self.courier).message, 'You have 2 new deliveries assigned.'
+        )
+
+    def test_bulk_transition_moves_allowed_rows_once(self):
+        from notifications.models import Notification
+        from .models import DailyOrderStats
+        from delivery.dispatch import dispatcher
+        from .transitions import ORDER_STATES
+
+        Order.objects.filter(pk=self.orders[2].pk).update(status='shipped')
+        dispatcher.loads()  # courier loads are read once, not per transition
+        with self.assertNumQueries(15):
+            moved = ORDER_STATES.bulk_transition(Order.objects.select_related('customer'), 'confirmed')
+
+        self.assertEqual(sorted(order.pk for order in moved), [self.orders[0].pk, self.orders[1].pk])
+        self.assertEqual(Order.objects.filter(status='confirmed').count(), 2)
+        self.assertEqual(Delivery.objects.filter(delivery_person=self.courier).count(), 2)
+        self.assertEqual(
+            Notification.objects.get(user=self.courier).message, 'You have 2 new deliveries assigned.'
+        )
+        self.assertEqual(DailyOrderStats.objects.get(status='confirmed').order_count, 2)
+
+    def test_bulk_transition_bumps_versions(self):
+        from ecommerce.versioning import ConcurrentUpdateError
+        from .transitions import ORDER_STATES
+
+        stale = Order.objects.get(pk=self.orders[0].pk)
+        moved = ORDER_STATES.bulk_transition(Order.objects.all(), 'cancelled')
+        self.assertEqual({order.version for order in moved}, {2})
+        self.assertEqual(set(Order.objects.values_list('version', flat=True)), {2})
+        stale.status = 'confirmed'
+        with self.assertRaises(ConcurrentUpdateError):
+            stale.save()
+
+class OrderAdminTestCase(TestCase):
+    """Test status changes made through the admin"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='admin123')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.order = Order.objects.create(customer=self.customer, total_price=100)
+        self.client.force_login(self.admin)
+
+    def change(self, status):
+        return self.client.post(f'/admin/orders/order/{self.order.pk}/change/', {
+            'customer': self.customer.pk, 'status': status, 'total_price': '100.00', 'version': self.order.version,
+            'items-TOTAL_FORMS': 0, 'items-INITIAL_FORMS': 0,
+        })
+
+    def test_undeclared_move_is_a_form_error(self):
+        response = self.change('delivered')
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response.context['adminform'].form, 'status', 'Cannot change status from pending to delivered.'
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+
+    def test_declared_move_is_saved(self):
+        response = self.change('confirmed')
+        self.assertEqual(response.status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'confirmed')
+
+class OrderBulkTransitionTestCase(QueryBudgetMixin, APITestCase):
+    """Test moving many orders through a transition in one request"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='admin123', role='admin')
+        self.customer = User.objects.create_user(
+            username='customer', password='customer123', role='customer', email='customer@example.com'
+        )
+        self.courier = User.objects.create_user(username='courier', password='courier123', role='delivery')
+        self.orders = [Order.objects.create(customer=self.customer, total_price=100) for _ in range(20)]
+        self.client.force_authenticate(user=self.admin)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post('/orders/bulk-transition/', {'ids': [self.orders[0].id], 'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_requires_ids_or_filter(self):
+        response = self.client.post('/orders/bulk-transition/', {'status': 'confirmed'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_by_ids_reports_each_order(self):
+        from notifications.models import OutboundEmail
+
+        Order.objects.filter(pk=self.orders[1].pk).update(status='shipped')
+        Order.objects.filter(pk=self.orders[2].pk).update(status='confirmed')
+        ids = [order.id for order in self.orders] + [9999]
+        OutboundEmail.objects.all().delete()
+
+        with self.assertQueryBudget(21):
+            response = self.client.post('/orders/bulk-transition/', {'ids': ids, 'status': 'confirmed'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['transitioned'], 18)
+        results = {row['id']: row for row in response.data['results']}
+        self.assertEqual(results[self.orders[0].id]['result'], 'transitioned')
+        self.assertEqual(results[self.orders[1].id]['result'], 'not_allowed')
+        self.assertEqual(results[self.orders[2].id]['result'], 'unchanged')
+        self.assertEqual(results[9999]['result'], 'not_found')
+        self.assertEqual(Delivery.objects.filter(delivery_person=self.courier).count(), 18)
+        self.assertEqual(OutboundEmail.objects.count(), 18)
+
+    def test_cancel_by_filter(self):
+        Order.objects.filter(pk=self.orders[0].pk).update(status='shipped')
+        response = self.client.post(
+            '/orders/bulk-transition/', {'filter': {'status': 'pending'}, 'status': 'cancelled'}, format='json'
+        )
+        self.assertEqual(response.data['transitioned'], 19)
+        self.assertEqual(Order.objects.filter(status='cancelled').count(), 19)
+        self.assertEqual(Order.objects.get(pk=self.orders[0].pk).status, 'shipped')
+
+class OrderIdempotencyTestCase(APITestCase):
+    """Test Idempotency-Key handling on order creation"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(name='Laptop', category=category, price=1000, stock=5, supplier=supplier)
+        self.client.force_authenticate(user=self.customer)
+
+    def post(self, quantity=1, key='retry-1'):
+        return self.client.post(
+            '/orders/', {'items': [{'product': self.product.id, 'quantity': quantity}]},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.post()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            retry = self.post()
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 4)
+
+    def test_key_reused_for_different_request(self):
+        self.post()
+        response = self.post(quantity=2)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failures_are_not_stored(self):
+        from .models import IdempotencyKey
+
+        self.assertEqual(self.post(quantity=10).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        Product.objects.filter(pk=self.product.pk).update(stock=10)
+        self.assertEqual(self.post(quantity=10).status_code, status.HTTP_201_CREATED)
+
+    def test_expired_keys_are_purged(self):
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import IdempotencyKey
+
+        self.post()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.post().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 expired', out.getvalue())
+
+class OrderExportTestCase(QueryBudgetMixin, APITestCase):
+    """Test streaming order exports"""
+
+    def setUp(self):
+        from .checkout import place_order
+
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.other = User.objects.create_user(username='other', password='other123', role='customer')
+        self.admin = User.objects.create_user(username='staff', password='admin123', role='admin')
+        supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        phone = Product.objects.create(name='Phone', category=category, price=300, stock=100, supplier=supplier)
+        case = Product.objects.create(name='Case', category=category, price=20, stock=100, supplier=supplier)
+        for customer in (self.customer, self.customer, self.other):
+            place_order(customer, [{'product': phone, 'quantity': 1}, {'product': case, 'quantity': 2}])
+        Order.objects.filter(customer=self.other).update(status='cancelled')
+
+    def export(self, **params):
+        response = self.client.get('/orders/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        import csv
+
+        self.client.force_authenticate(user=self.admin)
+        rows = list(csv.DictReader(self.export().splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['customer'], 'other')
+        self.assertIn('"product_name": "Case"', rows[0]['items'])
+
+    def test_jsonl_export_honours_list_filters(self):
+        import json
+
+        self.client.force_authenticate(user=self.admin)
+        lines = self.export(export_format='jsonl', status='pending').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record['customer'] for record in records], ['customer', 'customer'])
+        self.assertEqual([item['quantity'] for item in records[0]['items']], [1, 2])
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(len(self.export(export_format='jsonl').splitlines()), 1)
+
+    def test_export_query_count_is_constant(self):
+        from .checkout import place_order
+
+        self.client.force_authenticate(user=self.admin)
+        product = Product.objects.first()
+        for _ in range(10):
+            place_order(self.customer, [{'product': product, 'quantity': 1}])
+        with self.assertQueryBudget(2):
+            self.export(export_format='jsonl')
+
+    def test_unknown_format_is_rejected(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/orders/export/', {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class OrderQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Test order endpoints run a fixed number of queries regardless of size"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.admin = User.objects.create_user(username='staff', password='admin123', role='admin')
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.category = Category.objects.create(name='Electronics')
+        self.products = [
+            Product.objects.create(
+                name=f'Product {i}', category=self.category, price=10, stock=100, supplier=self.supplier
+            )
+            for i in range(10)
+        ]
+        for _ in range(10):
+            self.order = Order.objects.create(customer=self.customer, total_price=10)
+    
+    def test_order_list_budget(self):
+        self.client.force_authenticate(user=self.admin)
+        with self.assertQueryBudget(2):
+            response = self.client.get('/orders/')
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_order_create_budget(self):
+        self.client.force_authenticate(user=self.customer)
+        data = {'items': [{'product': p.id, 'quantity': 1} for p in self.products]}
+        # Includes first-of-the-day rollup row inserts
+        with self.assertQueryBudget(17):
+            response = self.client.post('/orders/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_order_detail_budget(self):
+        self.client.force_authenticate(user=self.customer)
+        with self.assertQueryBudget(1):
+            self.client.get(f'/orders/{self.order.id}/')
+        
+        self.client.force_authenticate(user=self.admin)
+        with self.assertQueryBudget(1):
+            response = self.client.patch(f'/orders/{self.order.id}/', {'status': 'confirmed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class OrderQueryPlanTestCase(QueryPlanMixin, TestCase):
+    """Order list and reporting queries are answered from indexes"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.admin = User.objects.create_user(username='admin', password='admin123', role='admin')
+
+    def test_customer_list_uses_customer_index(self):
+        from .views import OrderListCreateView
+
+        self.assertUsesIndex(self.list_queryset(OrderListCreateView, self.customer), 'order_customer_id_idx')
+
+    def test_status_range_uses_status_index(self):
+        from .views import OrderBulkTransitionView
+
+        view = self.make_view(OrderBulkTransitionView, self.admin)
+        serializer = view.get_serializer(data={
+            'status': 'cancelled', 'filter': {'status': 'pending', 'created_after': '2024-01-01T00:00:00Z'}
+        })
+        serializer.is_valid(raise_exception=True)
+        self.assertUsesIndex(serializer.select(view.get_queryset()), 'order_status_created_idx')
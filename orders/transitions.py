@@ -0,0 +1,68 @@
+from django.db.models import prefetch_related_objects
+
+from delivery.dispatch import dispatcher
+from delivery.models import Delivery
+from ecommerce.state_machine import StateMachine
+from notifications.utils import buffered_notifications, notify_user
+from products import stats as supplier_stats
+from . import rollups
+from .models import Order
+from .utils import send_order_status_emails
+
+ORDER_STATES = StateMachine(Order, 'status', {
+    'pending': ['confirmed', 'cancelled'],
+    'confirmed': ['shipped', 'cancelled'],
+    'shipped': ['delivered'],
+})
+
+# Statuses customers hear about here; delivery progress is reported by DELIVERY_STATES
+CUSTOMER_UPDATES = ['confirmed', 'shipped', 'cancelled']
+
+
+@ORDER_STATES.hook(on_commit=False)
+def update_status_rollups(orders, source, target):
+    rollups.record_status_changes(orders, source, target)
+
+
+@ORDER_STATES.hook('confirmed', on_commit=False)
+def create_deliveries(orders, source, target):
+    """Hand confirmed orders without a delivery to the least-loaded couriers"""
+    existing = set(Delivery.objects.filter(order__in=orders).order_by().values_list('order_id', flat=True))
+    dispatcher.assign_many(order for order in orders if order.pk not in existing)
+
+
+@ORDER_STATES.hook('cancelled', on_commit=False)
+def withdraw_deliveries(orders, source, target):
+    """Drop cancelled orders' open deliveries; deleting them frees their couriers"""
+    if source is not None:
+        Delivery.objects.filter(order__in=orders).exclude(status='delivered').delete()
+
+
+@ORDER_STATES.hook('delivered', on_commit=False)
+def credit_delivered_units(orders, source, target):
+    supplier_stats.record_orders_delivered(orders, sign=1)
+
+
+@ORDER_STATES.hook(source='delivered', on_commit=False)
+def revoke_delivered_units(orders, source, target):
+    supplier_stats.record_orders_delivered(orders, sign=-1)
+
+
+@ORDER_STATES.hook(*CUSTOMER_UPDATES, on_commit=False)
+def email_customers(orders, source, target):
+    # The outbox row is written with the transaction; the worker sends it after commit
+    if source is not None:
+        prefetch_related_objects(orders, 'customer')
+        send_order_status_emails(orders)
+
+
+@ORDER_STATES.hook(*CUSTOMER_UPDATES)
+def notify_customers(orders, source, target):
+    """Tell customers their order moved, with one bulk insert per batch"""
+    if source is None:
+        return
+    prefetch_related_objects(orders, 'customer')
+    status_display = dict(Order.STATUS_CHOICES)[target]
+    with buffered_notifications():
+        for order in orders:
+            notify_user(order.customer, f"Your order #{order.id} is now {status_display}.", notif_type="order")
@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import OrderListCreateView, OrderRetrieveUpdateView
+from .views import OrderBulkTransitionView, OrderExportView, OrderListCreateView, OrderRetrieveUpdateView
 
 urlpatterns = [
     path('', OrderListCreateView.as_view(), name='order-list-create'),
+    path('export/', OrderExportView.as_view(), name='order-export'),
+    path('bulk-transition/', OrderBulkTransitionView.as_view(), name='order-bulk-transition'),
     path('<int:pk>/', OrderRetrieveUpdateView.as_view(), name='order-detail'),
 ]
\ No newline at end of file
@@ -1,46 +1,57 @@
-from django.core.mail import send_mail
-from django.conf import settings
+from notifications.outbox import enqueue_email, enqueue_emails
 
 def send_order_confirmation_email(order):
-    """Sends an email to the customer upon order creation."""
-    try:
-        subject = f"Order Confirmation: Your Order #{order.id} is Placed!"
-        message = (
-            f"Dear {order.customer.username},\n\n"
-            f"Thank you for your order! Your total is ${order.total_price}.\n"
-            f"Your order status is currently: {order.status.capitalize()}.\n"
-            f"We will notify you when it ships.\n\n"
-            f"Ecommerce Team"
-        )
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL, # Must be configured in settings.py
-            [order.customer.email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        # Log the error, but don't fail the request
-        print(f"Error sending email for order {order.id}: {e}")
+    """Queues an email to the customer upon order creation."""
+    subject = f"Order Confirmation: Your Order #{order.id} is Placed!"
+    message = (
+        f"Dear {order.customer.username},\n\n"
+        f"Thank you for your order! Your total is ${order.total_price}.\n"
+        f"Your order status is currently: {order.status.capitalize()}.\n"
+        f"We will notify you when it ships.\n\n"
+        f"Ecommerce Team"
+    )
+    # Delivered by the send_outbox_emails worker once the order commits
+    enqueue_email(subject, message, [order.customer.email])
+
+
+def order_status_email(order):
+    """Build the (subject, message, recipient_list) for an order status change."""
+    subject = f"Order #{order.id} {order.get_status_display()}"
+    message = (
+        f"Dear {order.customer.username},\n\n"
+        f"Your order #{order.id} is now {order.get_status_display().lower()}.\n"
+        f"Total: ${order.total_price}\n\n"
+        f"Ecommerce Team"
+    )
+    return subject, message, [order.customer.email]
+
+
+def send_order_status_emails(orders):
+    """Queue the status emails for many orders with one INSERT."""
+    enqueue_emails([order_status_email(order) for order in orders])
+
+
+def delivery_status_email(delivery):
+    """Build the (subject, message, recipient_list) for a delivery status update."""
+    subject = f"Order #{delivery.order.id} {delivery.status.capitalize()}"
+    message = (
+        f"Dear {delivery.order.customer.username},\n\n"
+        f"Your order #{delivery.order.id} is now {delivery.status}.\n"
+        f"Total: ${delivery.order.total_price}\n\n"
+        f"Thank you for shopping with us!"
+    )
+    return subject, message, [delivery.order.customer.email]
 
 
 def send_delivery_status_email(delivery):
-    """Send email to customer when delivery status updates"""
-    try:
-        if delivery.status in ['shipped', 'delivered']:
-            subject = f"Order #{delivery.order.id} {delivery.status.capitalize()}"
-            message = (
-                f"Dear {delivery.order.customer.username},\n\n"
-                f"Your order #{delivery.order.id} is now {delivery.status}.\n"
-                f"Total: ${delivery.order.total_price}\n\n"
-                f"Thank you for shopping with us!"
-            )
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [delivery.order.customer.email],
-                fail_silently=False,
-            )
-    except Exception as e:
-        print(f"Error sending delivery email: {e}")
\ No newline at end of file
+    """Queue email to customer when delivery status updates"""
+    if delivery.status in ['shipped', 'delivered']:
+        enqueue_email(*delivery_status_email(delivery))
+
+
+def send_delivery_status_emails(deliveries):
+    """Queue the status emails for many deliveries with one INSERT."""
+    enqueue_emails([
+        delivery_status_email(delivery) for delivery in deliveries
+        if delivery.status in ['shipped', 'delivered']
+    ])
@@ -1,11 +1,19 @@
+from collections import defaultdict
+from functools import partial
 from rest_framework import generics, filters, permissions, serializers, status
 from rest_framework.response import Response
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
+from ecommerce.export import chunked_rows, export_response
+from ecommerce.pagination import HybridPagination
+from ecommerce.state_machine import TransitionNotAllowed
+from ecommerce.versioning import ConditionalUpdateMixin
+from . import idempotency
 from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderItemSerializer
+from .serializers import OrderBulkTransitionSerializer, OrderSerializer, OrderItemSerializer
+from .transitions import ORDER_STATES
 
-class OrderPagination(PageNumberPagination):
+class OrderPagination(HybridPagination):
     page_size = 10
  
 class OrderListCreateView(generics.ListCreateAPIView):
@@ -13,7 +21,7 @@ class OrderListCreateView(generics.ListCreateAPIView):
     List all orders (Admin) or create order (Customer).
     ONLY CUSTOMERS can create orders.
     """
-    queryset = Order.objects.all().order_by('-id')
+    queryset = Order.objects.select_related('customer').order_by('-id')
     serializer_class = OrderSerializer
     pagination_class = OrderPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
@@ -42,17 +50,47 @@ class OrderListCreateView(generics.ListCreateAPIView):
                 },
                 status=status.HTTP_403_FORBIDDEN
             )
+        # Retried requests carrying the same key get the first response back
+        key = request.headers.get(idempotency.HEADER)
+        if key:
+            return idempotency.idempotent_response(request, key, partial(super().create, request, *args, **kwargs))
         return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
 
-class OrderRetrieveUpdateView(generics.RetrieveUpdateAPIView):
+class OrderExportView(OrderListCreateView):
+    """
+    Stream every order the list view would show, with its items, as CSV or
+    JSON Lines (?export_format=csv|jsonl). Takes the same filters as the
+    list; items are read with one query per chunk of orders.
+    """
+    http_method_names = ['get', 'head', 'options']
+    export_fields = ['id', 'customer', 'status', 'total_price', 'created_at', 'updated_at', 'items']
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(request, 'orders', self.export_fields, self.export_records(queryset))
+
+    def export_records(self, queryset):
+        columns = ['id', 'customer__username', 'status', 'total_price', 'created_at', 'updated_at']
+        for chunk in chunked_rows(queryset, columns):
+            items = defaultdict(list)
+            order_items = (
+                OrderItem.objects.filter(order_id__in=[row[0] for row in chunk]).order_by('id')
+                .values_list('order_id', 'product_id', 'product__name', 'quantity', 'price')
+            )
+            for order_id, product_id, name, quantity, price in order_items:
+                items[order_id].append({'product': product_id, 'product_name': name, 'quantity': quantity, 'price': price})
+            for row in chunk:
+                yield {**dict(zip(self.export_fields, row)), 'items': items[row[0]]}
+
+class OrderRetrieveUpdateView(ConditionalUpdateMixin, generics.RetrieveUpdateAPIView):
     """
     Retrieve or update order status.
     Only Admin/Delivery Personnel can update status; customers can retrieve their own orders.
     """
-    queryset = Order.objects.all().order_by('-id')
+    queryset = Order.objects.select_related('customer').order_by('-id')
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -77,6 +115,51 @@ class OrderItemListView(generics.ListAPIView):
     def get_queryset(self):
         order_pk = self.kwargs['pk']
         user = self.request.user
+        queryset = OrderItem.objects.select_related('product')
         if user.role == "admin":
-            return OrderItem.objects.filter(order__pk=order_pk)
-        return OrderItem.objects.filter(order__pk=order_pk, order__customer=user)
\ No newline at end of file
+            return queryset.filter(order__pk=order_pk)
+        return queryset.filter(order__pk=order_pk, order__customer=user)
+
+class OrderBulkTransitionView(generics.GenericAPIView):
+    """
+    Move many orders to a new status in one request (Admin only).
+    Takes {"status": ..., "ids": [...]} or {"status": ..., "filter": {...}}
+    and reports the outcome for every selected order.
+    """
+    queryset = Order.objects.select_related('customer')
+    serializer_class = OrderBulkTransitionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if request.user.role != 'admin' and not request.user.is_staff:
+            return Response(
+                {"detail": "Only admins can change orders in bulk."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+        ids = serializer.validated_data.get('ids')
+
+        queryset = serializer.select(self.get_queryset())
+
+        with transaction.atomic():
+            current = dict(queryset.order_by().values_list('pk', 'status'))
+            moved = {order.pk for order in ORDER_STATES.bulk_transition(queryset, target)}
+
+        results = []
+        for pk in dict.fromkeys(ids) if ids is not None else sorted(current):
+            if pk in moved:
+                results.append({'id': pk, 'result': 'transitioned'})
+            elif pk not in current:
+                results.append({'id': pk, 'result': 'not_found'})
+            elif current[pk] == target:
+                results.append({'id': pk, 'result': 'unchanged'})
+            elif ORDER_STATES.can_transition(current[pk], target):
+                # Allowed when read, but changed before the UPDATE reached it
+                results.append({'id': pk, 'result': 'conflict', 'detail': "The order changed while it was being updated."})
+            else:
+                results.append({
+                    'id': pk, 'result': 'not_allowed', 'detail': str(TransitionNotAllowed(current[pk], target))
+                })
+        return Response({'status': target, 'transitioned': len(moved), 'results': results})
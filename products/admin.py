@@ -1,5 +1,9 @@
 from django.contrib import admin
 from .models import Product, Category
+
+class ProductAdmin(admin.ModelAdmin):
+    list_select_related = ('category',)
+
 # Register your models here.
-admin.site.register(Product)
-admin.site.register(Category)
\ No newline at end of file
+admin.site.register(Product, ProductAdmin)
+admin.site.register(Category)
@@ -1,27 +1,24 @@
-from .models import Product
-from orders.models import OrderItem, Order
-from delivery.models import Delivery
-from django.db.models import Sum, Count
+from .models import Product, SupplierStats
+from .stats import DELIVERY_STATUS_FIELDS, LOW_STOCK_THRESHOLD
 
 def get_supplier_dashboard_stats(user):
-    # Products and stock
-    products = Product.objects.filter(supplier=user)
-    low_stock = products.filter(stock__lt=5)
-    total_products = products.count()
+    # Counters are materialized in SupplierStats, so this is a single-row lookup
+    stats = SupplierStats.objects.filter(supplier=user).first() or SupplierStats(supplier=user)
 
-    # Delivered orders for supplier's products
-    delivered_items = (
-        OrderItem.objects.filter(product__supplier=user, order__status='delivered')
-        .aggregate(total_sold=Sum('quantity'))['total_sold'] or 0
-    )
+    # Products and stock
+    low_stock = Product.objects.filter(supplier=user, stock__lt=LOW_STOCK_THRESHOLD)
 
-    # Delivery status
-    deliveries = Delivery.objects.filter(order__items__product__supplier=user)
-    delivery_status_counts = deliveries.values('status').annotate(count=Count('id'))
+    # Delivery status, counting each delivery once per supplier
+    delivery_status_counts = [
+        {"status": status, "count": getattr(stats, field)}
+        for status, field in DELIVERY_STATUS_FIELDS.items()
+        if getattr(stats, field)
+    ]
 
     return {
-        "total_products": total_products,
+        "total_products": stats.product_count,
+        "low_stock_count": stats.low_stock_count,
         "low_stock": list(low_stock.values('name', 'stock')),
-        "delivered_items": delivered_items,
-        "delivery_status_counts": list(delivery_status_counts),
-    }
\ No newline at end of file
+        "delivered_items": stats.delivered_units,
+        "delivery_status_counts": delivery_status_counts,
+    }
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from ecommerce.versioning import next_version
+from . import inventory, stats as supplier_stats
+from .models import Product
+
+
+def _case(values, field):
+    """CASE setting field to {pk: value}, leaving other rows as they are."""
+    output_field = Product._meta.get_field(field)
+    return Case(
+        *[When(pk=pk, then=Value(value, output_field=output_field)) for pk, value in values.items()],
+        default=F(field), output_field=output_field,
+    )
+
+
+def apply_updates(queryset, items):
+    """
+    Apply [{id, stock | stock_delta, price, version}] to the products in
+    queryset (the caller's own) with one locked read and one CASE UPDATE,
+    in a single transaction. Returns one outcome per item, in order:
+    updated, unchanged, not_found (missing or not the caller's), conflict
+    (version moved on) or invalid (stock below zero or below the units
+    customers have reserved).
+    """
+    ids = [item['id'] for item in items]
+    with transaction.atomic():
+        current = {
+            pk: (stock, price, version, supplier_id, reserved) for pk, stock, price, version, supplier_id, reserved in
+            queryset.select_for_update().filter(pk__in=ids)
+            .values_list('pk', 'stock', 'price', 'version', 'supplier_id', 'reserved')
+        }
+        stocks, prices, results = {}, {}, []
+        for item in items:
+            pk = item['id']
+            if pk not in current:
+                results.append({'id': pk, 'result': 'not_found'})
+                continue
+            stock, price, version, _, reserved = current[pk]
+            if item.get('version', version) != version:
+                results.append({
+                    'id': pk, 'result': 'conflict', 'version': version,
+                    'detail': "The product changed since you read it.",
+                })
+                continue
+            new_stock = item['stock'] if 'stock' in item else stock + item.get('stock_delta', 0)
+            new_price = item.get('price', price)
+            if new_stock < 0:
+                results.append({
+                    'id': pk, 'result': 'invalid', 'detail': f"Stock cannot go below zero (currently {stock})."
+                })
+                continue
+            if new_stock < reserved:
+                results.append({
+                    'id': pk, 'result': 'invalid', 'detail': f"Stock cannot go below the {reserved} units reserved."
+                })
+                continue
+            if new_stock != stock:
+                stocks[pk] = new_stock
+            if new_price != price:
+                prices[pk] = new_price
+            changed = new_stock != stock or new_price != price
+            results.append({
+                'id': pk, 'result': 'updated' if changed else 'unchanged',
+                'stock': new_stock, 'price': new_price, 'version': version + 1 if changed else version,
+            })
+
+        changed_ids = stocks.keys() | prices.keys()
+        if changed_ids:
+            updates = {'version': next_version()}
+            if stocks:
+                updates['stock'] = _case(stocks, 'stock')
+                updates['stock_updated_at'] = _case(dict.fromkeys(stocks, timezone.now()), 'stock_updated_at')
+            if prices:
+                updates['price'] = _case(prices, 'price')
+            Product.objects.filter(pk__in=changed_ids).update(**updates)
+            inventory.record_movements(
+                (pk, 'adjustment', stock - current[pk][0], 'bulk') for pk, stock in stocks.items()
+            )
+            if stocks:
+                supplier_stats.refresh_product_counts({current[pk][3] for pk in stocks})
+    return results
@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from ecommerce.versioning import next_version
+from . import inventory, stats as supplier_stats
+from .models import Category, Product
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 1000
+UPDATE_FIELDS = ['name', 'description', 'category', 'price', 'stock', 'stock_updated_at']
+
+_MAX_PRICE = Decimal('99999999.99')
+
+
+def guess_format(filename):
+    return 'jsonl' if filename and filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_records(stream, import_format='csv'):
+    """
+    Yield (row number, dict or None) from a binary CSV (with a header row) or
+    JSON Lines stream, one line at a time. Unparseable lines yield None.
+    """
+    lines = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        # Row 1 is the header
+        for number, record in enumerate(csv.DictReader(lines), start=2):
+            yield number, record
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def _clean(record, categories):
+    """Validate one record; returns (values, errors)."""
+    if record is None:
+        return None, {'row': ["Not a valid record."]}
+    errors = {}
+    values = {}
+
+    for field, max_length in (('sku', 64), ('name', 100)):
+        value = str(record.get(field) or '').strip()
+        if not value:
+            errors[field] = ["This field is required."]
+        elif len(value) > max_length:
+            errors[field] = [f"Ensure this field has no more than {max_length} characters."]
+        values[field] = value
+    values['description'] = str(record.get('description') or '')
+
+    category = str(record.get('category') or '').strip()
+    values['category_id'] = categories.get(category.casefold())
+    if values['category_id'] is None:
+        errors['category'] = [f"Unknown category \"{category}\"." if category else "This field is required."]
+
+    try:
+        price = Decimal(str(record.get('price')).strip())
+        if not price.is_finite() or price < 0 or price > _MAX_PRICE or price != price.quantize(Decimal('0.01')):
+            raise InvalidOperation
+        values['price'] = price
+    except (InvalidOperation, ValueError):
+        errors['price'] = ["A valid price with at most 2 decimal places is required."]
+
+    # Only whole numbers: int() would truncate 1.7 and accept true as 1
+    stock = record.get('stock')
+    if stock is None or stock == '':
+        values['stock'] = 0
+    elif type(stock) is int and stock >= 0:
+        values['stock'] = stock
+    elif isinstance(stock, str) and stock.strip().isdecimal() and stock.strip().isascii():
+        values['stock'] = int(stock)
+    else:
+        errors['stock'] = ["A valid non-negative integer is required."]
+    return values, errors
+
+
+def _upsert(supplier, rows, report):
+    """
+    Insert or update one chunk of validated rows, keyed on (supplier, sku).
+    Rows that would take an existing product's stock below its reserved
+    units are reported and skipped.
+    """
+    skus = [values['sku'] for _, values in rows]
+    existing = {
+        sku: (pk, stock, reserved) for sku, pk, stock, reserved in
+        Product.objects.filter(supplier=supplier, sku__in=skus).values_list('sku', 'pk', 'stock', 'reserved')
+    }
+    kept = []
+    for number, values in rows:
+        reserved = existing[values['sku']][2] if values['sku'] in existing else 0
+        if values['stock'] < reserved:
+            report['errors'].append({'row': number, 'sku': values['sku'], 'errors': {
+                'stock': [f"Stock cannot go below the {reserved} units reserved."]
+            }})
+            del existing[values['sku']]
+        else:
+            kept.append((number, values))
+    if not kept:
+        return
+    rows = kept
+    now = timezone.now()
+    products = Product.objects.bulk_create(
+        [Product(supplier=supplier, stock_updated_at=now, **values) for _, values in rows],
+        update_conflicts=True, unique_fields=['supplier', 'sku'], update_fields=UPDATE_FIELDS,
+    )
+    updated = [pk for pk, _, _ in existing.values()]
+    if updated:
+        Product.objects.filter(pk__in=updated).update(version=next_version())
+
+    movements = []
+    for product in products:
+        if product.sku in existing:
+            pk, old_stock, _ = existing[product.sku]
+            movements.append((pk, 'adjustment', product.stock - old_stock, 'import'))
+        else:
+            movements.append((product.pk, 'restock', product.stock, 'import'))
+    inventory.record_movements(movements)
+    report['updated'] += len(existing)
+    report['created'] += len(products) - len(existing)
+
+
+def import_products(supplier, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Upsert a supplier's catalogue from (row number, record) pairs, keyed on
+    sku, with one transaction and a handful of queries per chunk.
+
+    Categories are resolved by name (case-insensitively) from one preloaded
+    map. Invalid rows are skipped and reported; valid rows are imported
+    regardless. Returns {'rows', 'created', 'updated', 'errors'}.
+    """
+    categories = {name.casefold(): pk for pk, name in Category.objects.values_list('pk', 'name')}
+    report = {'rows': 0, 'created': 0, 'updated': 0, 'errors': []}
+    seen = {}
+    records = iter(records)
+    while chunk := list(islice(records, chunk_size)):
+        valid = []
+        for number, record in chunk:
+            report['rows'] += 1
+            values, errors = _clean(record, categories)
+            if not errors and values['sku'] in seen:
+                errors = {'sku': [f"Duplicate of row {seen[values['sku']]}."]}
+            if errors:
+                report['errors'].append({'row': number, 'sku': (values or {}).get('sku') or None, 'errors': errors})
+                continue
+            seen[values['sku']] = number
+            valid.append((number, values))
+        if valid:
+            with transaction.atomic():
+                _upsert(supplier, valid, report)
+
+    if report['created'] or report['updated']:
+        supplier_stats.refresh_product_counts([supplier.pk])
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
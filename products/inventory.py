@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from ecommerce.versioning import next_version
+from . import stats as supplier_stats
+from .models import InventoryMovement, Product, StockSnapshot
+
+
+def record_movements(movements):
+    """
+    Append already-applied (product_id, kind, quantity, reference) movements
+    with one INSERT, for stock changes the caller has written itself.
+    """
+    return InventoryMovement.objects.bulk_create([
+        InventoryMovement(product_id=product_id, kind=kind, quantity=quantity, reference=reference)
+        for product_id, kind, quantity, reference in movements
+        if quantity
+    ])
+
+
+def restock(product, quantity, reference=''):
+    """
+    Queue a stock increase without touching the product row, so concurrent
+    restocks never contend on it. compact() folds it into Product.stock.
+    """
+    if quantity <= 0:
+        raise serializers.ValidationError({'quantity': ["A restock must add stock."]})
+    return InventoryMovement.objects.create(
+        product=product, kind='restock', quantity=quantity, applied=False, reference=reference
+    )
+
+
+def adjust(product, quantity, reference=''):
+    """Apply a signed stock correction at once; it may not take stock below zero or the reserved units."""
+    with transaction.atomic():
+        covered = {'stock__gte': F('reserved') - quantity} if quantity < 0 else {}
+        updated = Product.objects.filter(pk=product.pk, **covered).update(
+            stock=F('stock') + quantity, version=next_version(), stock_updated_at=timezone.now()
+        )
+        if not updated:
+            raise serializers.ValidationError(
+                {'quantity': ["Adjustment would make stock negative or leave reserved units uncovered."]}
+            )
+        supplier_stats.refresh_product_counts([product.supplier_id])
+        return InventoryMovement.objects.create(product=product, kind='adjustment', quantity=quantity, reference=reference)
+
+
+def _fold(movements):
+    deltas = defaultdict(int)
+    for movement in movements:
+        deltas[movement.product_id] += movement.quantity
+    Product.objects.filter(pk__in=deltas).update(
+        stock=Case(*[When(pk=pk, then=F('stock') + delta) for pk, delta in deltas.items()]),
+        version=next_version(),
+        stock_updated_at=timezone.now(),
+    )
+    InventoryMovement.objects.filter(pk__in=[movement.pk for movement in movements]).update(applied=True)
+    supplier_stats.refresh_product_counts(
+        Product.objects.filter(pk__in=deltas).values_list('supplier', flat=True).distinct()
+    )
+    return list(deltas)
+
+
+def compact(batch_size=1000):
+    """
+    Fold pending movements into Product.stock, one transaction per batch,
+    and snapshot the stock of every product they touched. A snapshot counts
+    every movement recorded by its taken_at, folded or not. Returns
+    (movements folded, snapshots written).
+    """
+    folded = snapshots = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                InventoryMovement.objects.select_for_update()
+                .filter(applied=False).order_by('id')[:batch_size]
+            )
+            if not batch:
+                return folded, snapshots
+            product_ids = _fold(batch)
+            taken_at = timezone.now()
+            # Movements still pending (later batches) belong in the snapshot too
+            pending = dict(
+                InventoryMovement.objects.filter(product__in=product_ids, applied=False, created_at__lte=taken_at)
+                .values_list('product').annotate(total=Sum('quantity')).order_by()
+            )
+            snapshots += len(StockSnapshot.objects.bulk_create([
+                StockSnapshot(product_id=pk, stock=stock + pending.get(pk, 0), taken_at=taken_at)
+                for pk, stock in Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock')
+            ]))
+        folded += len(batch)
+
+
+def stock_at(product, at):
+    """
+    Stock of product at time at: the latest snapshot taken by then plus the
+    movements recorded after it, or the whole ledger if there is no snapshot.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(product=product, taken_at__lte=at)
+        .order_by('-taken_at').values_list('stock', 'taken_at').first()
+    )
+    movements = InventoryMovement.objects.filter(product=product, created_at__lte=at)
+    base = 0
+    if snapshot is not None:
+        base, taken_at = snapshot
+        movements = movements.filter(created_at__gt=taken_at)
+    return base + (movements.aggregate(total=Sum('quantity'))['total'] or 0)
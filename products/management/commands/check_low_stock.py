@@ -1,9 +1,37 @@
+import time
 from django.core.management.base import BaseCommand
-from products.utils import batch_notify_low_stock
+from products.stats import LOW_STOCK_THRESHOLD
+from products.utils import DEFAULT_CHUNK_SIZE, batch_notify_low_stock, notify_low_stock_crossings
 
 class Command(BaseCommand):
-    help = 'Checks for low stock and notifies suppliers via email'
+    help = (
+        'Notifies suppliers via email about products that fell below the low-stock threshold '
+        'since the last run (or, with --full, about every low-stock product)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=int, default=LOW_STOCK_THRESHOLD, help='Alert on products with less stock than this')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Emails handed to the mail connection at once')
+        parser.add_argument('--dry-run', action='store_true', help='Count the alerts without sending or recording them')
+        parser.add_argument('--full', action='store_true', help='Alert about every low-stock product, however long it has been low')
 
     def handle(self, *args, **options):
-        batch_notify_low_stock()
-        self.stdout.write(self.style.SUCCESS('Successfully checked low stock and sent notifications'))
\ No newline at end of file
+        started = time.monotonic()
+        notify = batch_notify_low_stock if options['full'] else notify_low_stock_crossings
+        counts = notify(
+            threshold=options['threshold'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.monotonic() - started
+        action = 'would be emailed' if options['dry_run'] else f"emailed ({counts['sent']} sent)"
+        if options['full']:
+            summary = f"{counts['suppliers']} suppliers with {counts['products']} low-stock products {action}"
+        else:
+            summary = (
+                f"{counts['checked']} changed products checked, {counts['alerts']} fell below "
+                f"{options['threshold']} and {counts['recovered']} recovered; {counts['suppliers']} suppliers {action}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary}, {counts['skipped']} skipped without an email address, in {elapsed:.2f}s"
+        ))
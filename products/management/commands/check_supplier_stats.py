@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import SupplierStats
+from products.stats import STAT_FIELDS, compute_supplier_stats
+
+class Command(BaseCommand):
+    help = 'Recomputes supplier dashboard stats from scratch and reports (or fixes) drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted rows with the recomputed values')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            expected = compute_supplier_stats()
+            stored = {
+                row['supplier_id']: row
+                for row in SupplierStats.objects.values('supplier_id', *STAT_FIELDS)
+            }
+
+            drifted = []
+            for supplier_id in expected.keys() | stored.keys():
+                want = expected.get(supplier_id, dict.fromkeys(STAT_FIELDS, 0))
+                have = stored.get(supplier_id, {})
+                diff = {f: (have.get(f), want[f]) for f in STAT_FIELDS if have.get(f, 0) != want[f]}
+                if diff or supplier_id not in stored:
+                    drifted.append((supplier_id, want, diff))
+
+            for supplier_id, want, diff in drifted:
+                if diff:
+                    details = ', '.join(f'{f}: {old} -> {new}' for f, (old, new) in diff.items())
+                    self.stdout.write(f'Supplier #{supplier_id}: {details}')
+                if options['fix']:
+                    SupplierStats.objects.update_or_create(supplier_id=supplier_id, defaults=want)
+
+        mismatched = sum(1 for _, _, diff in drifted if diff)
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('Supplier stats are consistent'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed stats for {mismatched} supplier(s)'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{mismatched} supplier(s) out of sync; rerun with --fix'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from products.inventory import compact
+
+class Command(BaseCommand):
+    help = 'Folds pending inventory movements into product stock and snapshots it; run it periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Movements folded per transaction')
+
+    def handle(self, *args, **options):
+        folded, snapshots = compact(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Folded {folded} movements into stock, wrote {snapshots} snapshots'))
@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from products import imports
+from users.models import User
+
+class Command(BaseCommand):
+    help = "Upserts a supplier's catalogue from a CSV or JSON Lines file, keyed on sku"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or JSON Lines file')
+        parser.add_argument('--supplier', required=True, help='Username of the supplier who owns the products')
+        parser.add_argument('--format', choices=imports.FORMATS, help='File format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=imports.DEFAULT_CHUNK_SIZE, help='Rows validated and written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            supplier = User.objects.get(username=options['supplier'], role='supplier')
+        except User.DoesNotExist:
+            raise CommandError(f"No supplier named {options['supplier']}")
+
+        started = time.monotonic()
+        with open(options['path'], 'rb') as stream:
+            records = imports.read_records(stream, options['format'] or imports.guess_format(options['path']))
+            report = imports.import_products(supplier, records, chunk_size=options['chunk_size'])
+        elapsed = time.monotonic() - started
+
+        for error in report['errors']:
+            messages = '; '.join(f"{field}: {' '.join(problems)}" for field, problems in error['errors'].items())
+            self.stderr.write(f"Row {error['row']}: {messages}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} rows read: {report['created']} created, {report['updated']} updated, "
+            f"{len(report['errors'])} rejected, in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from products import search
+from products.models import Product
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text product search index in batches, in one transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products indexed per batch')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Full-text search index requires SQLite with FTS5.')
+
+        batch_size = options['batch_size']
+        table = search.FTS_TABLE
+        search.install()
+
+        # One transaction: searches keep seeing the old index until the new
+        # one commits, and trigger writes wait instead of being indexed twice
+        indexed = 0
+        last_id = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('delete-all')")
+            while True:
+                batch = list(
+                    Product.objects.filter(pk__gt=last_id)
+                    .order_by('pk')
+                    .values_list('pk', 'name', 'description')[:batch_size]
+                )
+                if not batch:
+                    break
+                cursor.executemany(
+                    f"INSERT INTO {table}(rowid, name, description) VALUES (%s, %s, %s)", batch
+                )
+                indexed += len(batch)
+                last_id = batch[-1][0]
+                self.stdout.write(f'Indexed {indexed} products')
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt search index for {indexed} products'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from products.reservations import release_expired
+
+class Command(BaseCommand):
+    help = 'Releases stock held by expired reservations; run it every minute or so'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reservations released per transaction')
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations'))
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from products import search
+
+
+def install_search_index(apps, schema_editor):
+    search.install(schema_editor.connection.alias)
+
+
+def uninstall_search_index(apps, schema_editor):
+    search.uninstall(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_search_index'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierStats',
+            fields=[
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='supplier_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('product_count', models.IntegerField(default=0)),
+                ('low_stock_count', models.IntegerField(default=0)),
+                ('delivered_units', models.IntegerField(default=0)),
+                ('deliveries_assigned', models.IntegerField(default=0)),
+                ('deliveries_picked', models.IntegerField(default=0)),
+                ('deliveries_in_transit', models.IntegerField(default=0)),
+                ('deliveries_delivered', models.IntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='low_stock_alert', serialize=False, to='products.product')),
+                ('stock', models.IntegerField()),
+                ('alerted_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LowStockScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scanned_until', models.DateTimeField(db_index=True)),
+                ('products_checked', models.IntegerField(default=0)),
+                ('alerts', models.IntegerField(default=0)),
+                ('recovered', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='stock_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock_updated_at'], name='product_stock_updated_idx'),
+        ),
+    ]
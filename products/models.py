@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from ecommerce.versioning import VersionedMixin
 from users.models import User
 
 class Category(models.Model):
@@ -9,14 +11,148 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
-class Product(models.Model):
+class Product(VersionedMixin, models.Model):
     """Product model with inventory tracking and supplier relationship."""
     name = models.CharField(max_length=100)
+    # Supplier's own stock-keeping code, the key catalogue imports upsert on
+    sku = models.CharField(max_length=64, null=True, blank=True)
     description = models.TextField(blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
-    supplier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products')
+    # Units held by StockReservation rows; stock - reserved is available to others
+    reserved = models.PositiveIntegerField(default=0)
+    # Indexed by product_supplier_id_idx and unique_supplier_sku, which both lead with supplier
+    supplier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='products', db_index=False)
+    # Optimistic-concurrency counter, bumped by every write
+    version = models.PositiveIntegerField(default=1)
+    # Set by every stock write, so check_low_stock only re-reads changed products
+    stock_updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['supplier', '-id'], name='product_supplier_id_idx'),
+            models.Index(fields=['stock'], name='product_stock_idx'),
+            # Customer catalogue: in-stock products, newest first
+            models.Index(fields=['-id'], condition=models.Q(stock__gt=0), name='product_in_stock_idx'),
+            models.Index(fields=['stock_updated_at'], name='product_stock_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['supplier', 'sku'], name='unique_supplier_sku'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.category.name})"
+
+    def save(self, *args, **kwargs):
+        if self.has_changed('stock'):
+            self.stock_updated_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'stock' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'stock_updated_at'}
+        super().save(*args, **kwargs)
+
+    @property
+    def available(self):
+        return self.stock - self.reserved
+
+class SupplierStats(models.Model):
+    """
+    Materialized supplier dashboard figures, one row per supplier.
+    Kept current by products.stats; check_supplier_stats recomputes it.
+    """
+    supplier = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='supplier_stats')
+    product_count = models.IntegerField(default=0)
+    low_stock_count = models.IntegerField(default=0)
+    delivered_units = models.IntegerField(default=0)
+    # Distinct deliveries carrying at least one of the supplier's products, by status
+    deliveries_assigned = models.IntegerField(default=0)
+    deliveries_picked = models.IntegerField(default=0)
+    deliveries_in_transit = models.IntegerField(default=0)
+    deliveries_delivered = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for supplier #{self.supplier_id}"
+
+class StockReservation(models.Model):
+    """
+    Stock held for a customer's cart until expires_at. Create and release
+    rows through products.reservations so Product.reserved stays in step.
+    """
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer', 'product'], name='reservation_customer_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x product #{self.product_id} for user #{self.customer_id}"
+
+class InventoryMovement(models.Model):
+    """
+    Append-only ledger of stock changes. Sales and adjustments are applied
+    to Product.stock as they are recorded; restocks are only appended and
+    folded into the stock (and a StockSnapshot) by compact_inventory_ledger.
+    """
+    KIND_CHOICES = [
+        ('sale', 'Sale'),
+        ('restock', 'Restock'),
+        ('adjustment', 'Adjustment'),
+    ]
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField()  # signed change to stock
+    applied = models.BooleanField(default=True)
+    reference = models.CharField(max_length=50, blank=True)  # e.g. "order:42"
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='movement_product_time_idx'),
+            models.Index(fields=['id'], condition=models.Q(applied=False), name='movement_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} for product #{self.product_id}"
+
+class StockSnapshot(models.Model):
+    """Product.stock as of taken_at, the starting point for stock-at-time queries."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    stock = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-taken_at'], name='snapshot_product_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"Product #{self.product_id}: {self.stock} at {self.taken_at}"
+
+class LowStockAlert(models.Model):
+    """
+    A product suppliers have been alerted about as low on stock, with the
+    stock level and time of the alert. Deleted when stock recovers, so the
+    next fall below the threshold alerts again.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='low_stock_alert')
+    stock = models.IntegerField()
+    alerted_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Product #{self.product_id} low at {self.stock}"
+
+class LowStockScan(models.Model):
+    """One incremental check_low_stock run; the latest scanned_until is where the next run starts."""
+    scanned_until = models.DateTimeField(db_index=True)
+    products_checked = models.IntegerField(default=0)
+    alerts = models.IntegerField(default=0)
+    recovered = models.IntegerField(default=0)
 
     def __str__(self):
-        return f"{self.name} ({self.category.name})"
\ No newline at end of file
+        return f"Low-stock scan up to {self.scanned_until}"
@@ -0,0 +1,101 @@
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from ecommerce.versioning import next_version
+from .models import Product, StockReservation
+
+DEFAULT_TTL = 15 * 60  # seconds
+
+
+def _adjust_reserved(deltas, condition=None):
+    """
+    Add {product_id: delta} to Product.reserved with one UPDATE. With a
+    condition, only matching rows are changed; returns the rows updated.
+    """
+    new_reserved = Case(*[When(pk=pk, then=F('reserved') + delta) for pk, delta in deltas.items()])
+    products = Product.objects.filter(pk__in=deltas)
+    if condition is not None:
+        products = products.filter(condition)
+    return products.update(reserved=new_reserved, version=next_version())
+
+
+def reserve(customer, items, ttl=None):
+    """
+    Hold stock for (product, quantity) items until the TTL runs out.
+
+    All items are reserved with one conditional UPDATE, or none are: if any
+    product lacks available stock a per-item ValidationError is raised.
+    """
+    if not items:
+        raise serializers.ValidationError({'items': ["Reserve at least one item."]})
+    quantities = defaultdict(int)
+    for product, quantity in items:
+        quantities[product.pk] += quantity
+
+    ttl = ttl if ttl is not None else getattr(settings, 'STOCK_RESERVATION_TTL', DEFAULT_TTL)
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    with transaction.atomic():
+        savepoint = transaction.savepoint()
+        has_stock = reduce(or_, (Q(pk=pk, stock__gte=F('reserved') + qty) for pk, qty in quantities.items()))
+        if _adjust_reserved(quantities, has_stock) != len(quantities):
+            transaction.savepoint_rollback(savepoint)
+            available = {
+                pk: stock - reserved
+                for pk, stock, reserved in Product.objects.filter(pk__in=quantities).values_list('pk', 'stock', 'reserved')
+            }
+            raise serializers.ValidationError({'items': [
+                {'quantity': [f"Insufficient stock for product: {product.name} (available: {available[product.pk]})"]}
+                if available[product.pk] < quantities[product.pk] else {}
+                for product, quantity in items
+            ]})
+        return StockReservation.objects.bulk_create([
+            StockReservation(customer=customer, product=product, quantity=quantity, expires_at=expires_at)
+            for product, quantity in items
+        ])
+
+
+def _release(reservations):
+    deltas = defaultdict(int)
+    for reservation in reservations:
+        deltas[reservation.product_id] -= reservation.quantity
+    if deltas:
+        _adjust_reserved(deltas)
+        StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).delete()
+
+
+def release(reservations):
+    """Give reserved stock back and delete the reservations."""
+    with transaction.atomic():
+        _release(list(reservations))
+
+
+def active_reservations(customer, product_ids):
+    """Unexpired reservations a customer holds on the given products, locked for checkout."""
+    return list(
+        StockReservation.objects.select_for_update()
+        .filter(customer=customer, product__in=product_ids, expires_at__gt=timezone.now())
+    )
+
+
+def release_expired(batch_size=1000):
+    """Release expired reservations in batches of one transaction each; returns the number released."""
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update()
+                .filter(expires_at__lte=timezone.now())
+                .order_by('expires_at')[:batch_size]
+            )
+            _release(batch)
+        released += len(batch)
+        if len(batch) < batch_size:
+            return released
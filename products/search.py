@@ -0,0 +1,130 @@
+import re
+
+from django.db import connections
+from django.utils.html import escape
+from rest_framework import filters
+
+FTS_TABLE = 'products_product_fts'
+
+INSTALL_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='products_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON products_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+UNINSTALL_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# bm25 column weights: a hit in the name outranks one in the description
+RANK_SQL = f"bm25({FTS_TABLE}, 10.0, 1.0)"
+# Match boundaries come back as control characters, not tags: the indexed
+# text is supplier-written and is HTML-escaped before they become <mark>
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_SQL = f"snippet({FTS_TABLE}, -1, char(2), char(3), '...', 12)"
+
+
+def is_supported(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def install(using='default'):
+    """
+    Create the FTS5 index and the triggers that keep it in sync.
+
+    Safe to run repeatedly; SQLite drops a table's triggers whenever Django
+    rebuilds it during a migration, so this also runs after every migrate.
+    """
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+
+
+def uninstall(using='default'):
+    if not is_supported(using):
+        return
+    with connections[using].cursor() as cursor:
+        for statement in UNINSTALL_SQL:
+            cursor.execute(statement)
+
+
+def build_match_query(terms):
+    """
+    Turn free-text search terms into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix token and all of them must match, so
+    user input can never inject FTS5 query syntax.
+    """
+    tokens = []
+    for term in terms:
+        tokens.extend(re.findall(r'\w+', term))
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def highlight(snippet):
+    """Render a raw FTS snippet as escaped HTML with matches in <mark> tags."""
+    marked = ''.join(
+        escape(part) if index % 2 == 0 else f'<mark>{escape(part)}</mark>'
+        for index, part in enumerate(re.split(f'{MARK_START}(.*?){MARK_END}', snippet, flags=re.S))
+    )
+    return marked.replace(MARK_START, '').replace(MARK_END, '')
+
+
+def search_products(queryset, match):
+    """
+    Restrict a Product queryset to FTS matches, best BM25 rank first.
+
+    Each result is annotated with ``search_rank`` and a raw
+    ``search_snippet``; render it with highlight().
+    """
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+        select={'search_rank': RANK_SQL, 'search_snippet': SNIPPET_SQL},
+    ).order_by('search_rank')
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the FTS5 index instead of ``LIKE '%term%'`` scans.
+
+    Falls back to the regular SearchFilter on databases without FTS5.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_supported(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        match = build_match_query(self.get_search_terms(request))
+        if not match:
+            return queryset
+        return search_products(queryset, match)
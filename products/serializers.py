@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Product, Category
+from .search import highlight
+from .models import InventoryMovement, Product, Category, StockReservation
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -10,7 +11,97 @@ class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source="category", write_only=True)
     supplier = serializers.StringRelatedField(read_only=True)
+    available = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'category', 'category_id', 'price', 'stock', 'supplier']
\ No newline at end of file
+        fields = [
+            'id', 'sku', 'name', 'description', 'category', 'category_id', 'price', 'stock', 'available', 'supplier',
+            'version',
+        ]
+        read_only_fields = ['version']
+
+    def validate_sku(self, value):
+        if not value:
+            return None  # blank SKUs never collide
+        supplier_id = self.instance.supplier_id if self.instance else self.context['request'].user.pk
+        others = Product.objects.filter(supplier_id=supplier_id, sku=value)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError("You already have a product with this SKU.")
+        return value
+
+    def validate(self, attrs):
+        # Units held by reservations must stay covered, or their holders' checkouts fail
+        if self.instance is not None and attrs.get('stock', self.instance.stock) < self.instance.reserved:
+            raise serializers.ValidationError(
+                {'stock': [f"Stock cannot go below the {self.instance.reserved} units reserved."]}
+            )
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Present only on results of a full-text search
+        if hasattr(instance, 'search_snippet'):
+            data['search_snippet'] = highlight(instance.search_snippet)
+        return data
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'product', 'product_name', 'quantity', 'expires_at']
+        read_only_fields = fields
+
+class ReservationItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+class ReservationRequestSerializer(serializers.Serializer):
+    items = ReservationItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        # Resolve every product with a single query
+        products = Product.objects.in_bulk({item['product'] for item in items})
+        errors = [
+            {} if item['product'] in products else {'product': [f"Invalid pk \"{item['product']}\" - object does not exist."]}
+            for item in items
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return [(products[item['product']], item['quantity']) for item in items]
+
+class InventoryMovementSerializer(serializers.ModelSerializer):
+    kind = serializers.ChoiceField(choices=[('restock', 'Restock'), ('adjustment', 'Adjustment')])
+
+    class Meta:
+        model = InventoryMovement
+        fields = ['id', 'kind', 'quantity', 'applied', 'reference', 'created_at']
+        read_only_fields = ['applied', 'created_at']
+
+class ProductBulkUpdateItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    stock_delta = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    # Optional: the version the caller last read; the row is skipped if it moved on
+    version = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if 'stock' in attrs and 'stock_delta' in attrs:
+            raise serializers.ValidationError("Provide stock or stock_delta, not both.")
+        if not {'stock', 'stock_delta', 'price'} & attrs.keys():
+            raise serializers.ValidationError("Provide stock, stock_delta or price.")
+        return attrs
+
+class ProductBulkUpdateSerializer(serializers.ListSerializer):
+    child = ProductBulkUpdateItemSerializer()
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Provide at least one product.")
+        if len({item['id'] for item in attrs}) != len(attrs):
+            raise serializers.ValidationError("Each product may appear only once.")
+        return attrs
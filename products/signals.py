@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from products.models import Product
+from . import inventory, stats as supplier_stats
+
+@receiver(post_save, sender=Product)
+def refresh_supplier_product_counts(sender, instance, created, **kwargs):
+    """
+    Keep the supplier's product and low-stock counts current
+    """
+    if created:
+        supplier_stats.refresh_product_counts([instance.supplier_id])
+    elif instance.has_changed('supplier'):
+        supplier_stats.refresh_product_counts([instance.supplier_id, instance.previous_value('supplier')])
+    elif instance.has_changed('stock'):
+        supplier_stats.refresh_product_counts([instance.supplier_id])
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_supplier_counts(sender, instance, **kwargs):
+    supplier_stats.refresh_product_counts([instance.supplier_id])
+
+@receiver(post_save, sender=Product)
+def record_stock_writes(sender, instance, created, **kwargs):
+    """
+    Log initial stock and direct stock edits (e.g. supplier PATCHes) in the
+    inventory ledger; checkout and products.inventory log their own
+    """
+    if created:
+        inventory.record_movements([(instance.pk, 'restock', instance.stock, 'created')])
+    elif instance.has_changed('stock') and instance.previous_value('stock') is not None:
+        delta = instance.stock - instance.previous_value('stock')
+        inventory.record_movements([(instance.pk, 'adjustment', delta, 'edit')])
@@ -0,0 +1,146 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Product, SupplierStats
+
+LOW_STOCK_THRESHOLD = 5
+
+DELIVERY_STATUS_FIELDS = {
+    'assigned': 'deliveries_assigned',
+    'picked': 'deliveries_picked',
+    'in_transit': 'deliveries_in_transit',
+    'delivered': 'deliveries_delivered',
+}
+
+STAT_FIELDS = ['product_count', 'low_stock_count', 'delivered_units', *DELIVERY_STATUS_FIELDS.values()]
+
+
+def _ensure_rows(supplier_ids):
+    SupplierStats.objects.bulk_create(
+        [SupplierStats(supplier_id=pk) for pk in supplier_ids], ignore_conflicts=True
+    )
+
+
+def _count_products(**filters):
+    counts = (
+        Product.objects.filter(supplier=OuterRef('supplier'), **filters)
+        .order_by()
+        .values('supplier')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def refresh_product_counts(supplier_ids):
+    """
+    Recompute product and low-stock counts for the given suppliers with one
+    UPDATE. Exact regardless of how stock was written (save, F() update or
+    bulk operations), and cheap thanks to the supplier index on products.
+    """
+    supplier_ids = {pk for pk in supplier_ids if pk is not None}
+    if not supplier_ids:
+        return
+    _ensure_rows(supplier_ids)
+    SupplierStats.objects.filter(supplier_id__in=supplier_ids).update(
+        product_count=_count_products(),
+        low_stock_count=_count_products(stock__lt=LOW_STOCK_THRESHOLD),
+    )
+
+
+def _apply_deltas(deltas):
+    """Apply {supplier_id: {field: delta}} increments."""
+    deltas = {pk: fields for pk, fields in deltas.items() if any(fields.values())}
+    if not deltas:
+        return
+    _ensure_rows(deltas)
+    for supplier_id, fields in deltas.items():
+        SupplierStats.objects.filter(supplier_id=supplier_id).update(
+            **{field: F(field) + delta for field, delta in fields.items() if delta}
+        )
+
+
+def record_order_delivered(order, sign=1):
+    """Add (or with sign=-1 remove) an order's units to its suppliers' delivered totals."""
+    record_orders_delivered([order], sign)
+
+
+def record_orders_delivered(orders, sign=1):
+    """Add (or with sign=-1 remove) the units of many orders with one aggregate query."""
+    from orders.models import OrderItem
+    units = (
+        OrderItem.objects.filter(order__in=[order.pk for order in orders])
+        .values_list('product__supplier')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+    )
+    _apply_deltas({supplier_id: {'delivered_units': sign * total} for supplier_id, total in units})
+
+
+def record_delivery_status(delivery, old_status=None, new_status=None):
+    """
+    Move a delivery between status buckets for every supplier on its order.
+    Pass only new_status for a created delivery and only old_status for a deleted one.
+    """
+    record_delivery_statuses([delivery], old_status, new_status)
+
+
+def record_delivery_statuses(deliveries, old_status=None, new_status=None):
+    """Move many deliveries that share old and new statuses, looking up their suppliers at once."""
+    from orders.models import OrderItem
+    if old_status == new_status or not deliveries:
+        return
+    order_suppliers = (
+        OrderItem.objects.filter(order__in=[delivery.order_id for delivery in deliveries])
+        .values_list('order', 'product__supplier')
+        .distinct()
+    )
+    moved = defaultdict(int)
+    for order_id, supplier_id in order_suppliers:
+        moved[supplier_id] += 1  # deliveries and orders are one to one
+    deltas = defaultdict(dict)
+    for supplier_id, count in moved.items():
+        if old_status in DELIVERY_STATUS_FIELDS:
+            deltas[supplier_id][DELIVERY_STATUS_FIELDS[old_status]] = -count
+        if new_status in DELIVERY_STATUS_FIELDS:
+            deltas[supplier_id][DELIVERY_STATUS_FIELDS[new_status]] = count
+    _apply_deltas(deltas)
+
+
+def compute_supplier_stats():
+    """Recompute every supplier's stats from scratch: {supplier_id: {field: value}}."""
+    from delivery.models import Delivery
+    from orders.models import OrderItem
+
+    stats = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+    products = (
+        Product.objects.values_list('supplier')
+        .annotate(total=Count('id'), low=Count('id', filter=Q(stock__lt=LOW_STOCK_THRESHOLD)))
+        .order_by()
+    )
+    for supplier_id, total, low in products:
+        stats[supplier_id]['product_count'] = total
+        stats[supplier_id]['low_stock_count'] = low
+
+    delivered = (
+        OrderItem.objects.filter(order__status='delivered')
+        .values_list('product__supplier')
+        .annotate(units=Sum('quantity'))
+        .order_by()
+    )
+    for supplier_id, units in delivered:
+        stats[supplier_id]['delivered_units'] = units
+
+    deliveries = (
+        Delivery.objects.filter(order__items__isnull=False)
+        .values_list('order__items__product__supplier', 'status')
+        .annotate(count=Count('id', distinct=True))
+        .order_by()
+    )
+    for supplier_id, status, count in deliveries:
+        stats[supplier_id][DELIVERY_STATUS_FIELDS[status]] = count
+
+    return dict(stats)
@@ -1,8 +1,11 @@
 # products/tests.py
+from decimal import Decimal
+from io import StringIO
 from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from ecommerce.testing import QueryBudgetMixin, QueryPlanMixin
 from .models import Product, Category
 
 User = get_user_model()
@@ -124,6 +127,36 @@ class ProductAPITestCase(APITestCase):
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['name'], 'iPhone')
     
+    def test_cursor_pagination(self):
+        """Test opt-in keyset pagination skips the count and walks pages by cursor"""
+        for i in range(15):
+            Product.objects.create(
+                name=f'Product {i}', category=self.category, price=10, stock=1, supplier=self.supplier
+            )
+
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get('/products/?cursor=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNone(response.data['previous'])
+        first_page_ids = [p['id'] for p in response.data['results']]
+        self.assertEqual(first_page_ids, sorted(first_page_ids, reverse=True))
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+        self.assertFalse(set(first_page_ids) & {p['id'] for p in response.data['results']})
+
+    def test_cursor_pagination_rejects_ordering_and_search(self):
+        """Test cursor mode refuses orders it would silently replace"""
+        self.client.force_authenticate(user=self.customer)
+        for query in ('ordering=price', 'search=iphone'):
+            response = self.client.get(f'/products/?cursor=&{query}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('cursor', response.data)
+    
     def test_supplier_dashboard_access(self):
         """Test supplier dashboard access"""
         self.client.force_authenticate(user=self.supplier)
@@ -137,6 +170,154 @@ class ProductAPITestCase(APITestCase):
         response = self.client.get('/products/dashboard/')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+class ProductSearchTestCase(APITestCase):
+    """Test full-text product search"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.category = Category.objects.create(name='Electronics')
+        self.accessory = Product.objects.create(
+            name='Case', description='Fits every laptop bag', category=self.category,
+            price=20, stock=5, supplier=self.supplier
+        )
+        self.laptop = Product.objects.create(
+            name='Laptop Pro', description='Fast machine', category=self.category,
+            price=1500, stock=5, supplier=self.supplier
+        )
+        self.client.force_authenticate(user=self.customer)
+    
+    def test_search_ranks_name_matches_first(self):
+        """Test BM25 ranking favours name matches and results carry a snippet"""
+        response = self.client.get('/products/?search=laptop')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [p['id'] for p in response.data['results']],
+            [self.laptop.id, self.accessory.id]
+        )
+        self.assertIn('<mark>', response.data['results'][0]['search_snippet'])
+
+    def test_search_snippet_escapes_product_text(self):
+        """Test snippets HTML-escape supplier text and only add <mark> tags themselves"""
+        self.laptop.name = '<img src=x onerror=alert(1)>'
+        self.laptop.save()
+        response = self.client.get('/products/?search=alert')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['results'][0]['search_snippet'],
+            '&lt;img src=x onerror=<mark>alert</mark>(1)&gt;'
+        )
+    
+    def test_search_index_follows_writes(self):
+        """Test the index stays in sync with updates and deletes"""
+        self.laptop.name = 'Notebook Pro'
+        self.laptop.description = ''
+        self.laptop.save()
+        self.accessory.delete()
+        
+        response = self.client.get('/products/?search=laptop')
+        self.assertEqual(response.data['count'], 0)
+        response = self.client.get('/products/?search=noteb')
+        self.assertEqual([p['id'] for p in response.data['results']], [self.laptop.id])
+    
+    def test_search_input_is_escaped(self):
+        """Test FTS5 syntax in user input is treated as plain words"""
+        response = self.client.get('/products/?search=laptop" OR "*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+    
+    def test_rebuild_command(self):
+        """Test the rebuild command repopulates the index"""
+        from django.core.management import call_command
+        from django.db import connection
+        from .search import FTS_TABLE
+        
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(self.client.get('/products/?search=laptop').data['count'], 0)
+        
+        call_command('rebuild_product_search', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.client.get('/products/?search=laptop').data['count'], 2)
+    
+    def test_failed_rebuild_keeps_old_index(self):
+        """Test a rebuild interrupted mid-way rolls back to the previous index"""
+        from django.core.management import call_command
+        
+        class FailingOutput(StringIO):
+            def write(self, text):
+                raise RuntimeError('interrupted')
+        
+        with self.assertRaises(RuntimeError):
+            call_command('rebuild_product_search', batch_size=1, stdout=FailingOutput())
+        self.assertEqual(self.client.get('/products/?search=laptop').data['count'], 2)
+
+class SupplierStatsTestCase(TestCase):
+    """Test the materialized supplier dashboard stats"""
+    
+    def setUp(self):
+        from orders.checkout import place_order
+        
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.other_supplier = User.objects.create_user(username='other', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.courier = User.objects.create_user(username='courier', password='courier123', role='delivery')
+        self.category = Category.objects.create(name='Electronics')
+        self.laptop = Product.objects.create(name='Laptop', category=self.category, price=1000, stock=6, supplier=self.supplier)
+        self.mouse = Product.objects.create(name='Mouse', category=self.category, price=20, stock=50, supplier=self.supplier)
+        self.cable = Product.objects.create(name='Cable', category=self.category, price=5, stock=2, supplier=self.other_supplier)
+        
+        # Two lines from the same supplier must still count as one delivery
+        self.order = place_order(self.customer, [
+            {'product': self.laptop, 'quantity': 2},
+            {'product': self.mouse, 'quantity': 3},
+            {'product': self.cable, 'quantity': 1},
+        ])
+    
+    def test_stats_follow_writes(self):
+        from delivery.models import Delivery
+        from .analytics import get_supplier_dashboard_stats
+        
+        delivery = Delivery.objects.create(order=self.order, delivery_person=self.courier)
+        delivery.status = 'in_transit'
+        delivery.save()
+        for next_status in ('confirmed', 'shipped', 'delivered'):
+            self.order.status = next_status
+            self.order.save()
+        
+        stats = get_supplier_dashboard_stats(self.supplier)
+        self.assertEqual(stats['total_products'], 2)
+        self.assertEqual(stats['low_stock_count'], 1)  # Laptop went from 6 to 4
+        self.assertEqual(stats['low_stock'], [{'name': 'Laptop', 'stock': 4}])
+        self.assertEqual(stats['delivered_items'], 5)
+        self.assertEqual(stats['delivery_status_counts'], [{'status': 'in_transit', 'count': 1}])
+        
+        stats = get_supplier_dashboard_stats(self.other_supplier)
+        self.assertEqual(stats['delivered_items'], 1)
+        self.assertEqual(stats['low_stock_count'], 1)
+    
+    def test_check_command_detects_and_fixes_drift(self):
+        from django.core.management import call_command
+        from delivery.models import Delivery
+        from .models import SupplierStats
+        
+        Delivery.objects.create(order=self.order, delivery_person=self.courier)
+        self.mouse.delete()
+        
+        out = StringIO()
+        call_command('check_supplier_stats', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+        
+        SupplierStats.objects.filter(supplier=self.supplier).update(product_count=99, deliveries_assigned=0)
+        out = StringIO()
+        call_command('check_supplier_stats', stdout=out)
+        self.assertIn('product_count: 99 -> 1', out.getvalue())
+        
+        call_command('check_supplier_stats', fix=True, stdout=StringIO())
+        stats = SupplierStats.objects.get(supplier=self.supplier)
+        self.assertEqual((stats.product_count, stats.deliveries_assigned), (1, 1))
+
 class ProductUtilsTestCase(TestCase):
     """Test product utility functions"""
     
@@ -159,4 +340,620 @@ class ProductUtilsTestCase(TestCase):
         
         # In a real test, you'd check if emails were queued/sent
         # This tests that the function runs without errors
-        self.assertTrue(True)  # Placeholder assertion
\ No newline at end of file
+        self.assertTrue(True)  # Placeholder assertion
+
+    def test_low_stock_alerts_use_one_query_and_chunked_sends(self):
+        from django.core import mail
+        from .utils import batch_notify_low_stock
+
+        self.supplier.email = 'supplier@example.com'
+        self.supplier.save()
+        other = User.objects.create_user(username='other', password='other123', role='supplier', email='other@example.com')
+        User.objects.create_user(username='silent', password='silent123', role='supplier')
+        for name, stock, supplier in [('Cable', 1, other), ('Plug', 0, other), ('Stocked', 40, other)]:
+            Product.objects.create(name=name, category=self.category, price=5, stock=stock, supplier=supplier)
+        Product.objects.create(
+            name='Hidden', category=self.category, price=5, stock=1,
+            supplier=User.objects.get(username='silent')
+        )
+        mail.outbox = []
+
+        with self.assertNumQueries(1):
+            counts = batch_notify_low_stock(chunk_size=1)
+        self.assertEqual(counts, {'suppliers': 3, 'products': 4, 'sent': 2, 'skipped': 1})
+        self.assertEqual([message.to for message in mail.outbox], [['supplier@example.com'], ['other@example.com']])
+        self.assertIn("Cable (Stock: 1)\nPlug (Stock: 0)", mail.outbox[1].body)
+
+    def test_check_low_stock_dry_run(self):
+        from django.core import mail
+        from django.core.management import call_command
+
+        self.supplier.email = 'supplier@example.com'
+        self.supplier.save()
+        mail.outbox = []
+        out = StringIO()
+        call_command('check_low_stock', '--full', '--dry-run', stdout=out)
+        self.assertEqual(mail.outbox, [])
+        self.assertIn('1 suppliers with 1 low-stock products would be emailed', out.getvalue())
+
+    def test_stock_writes_stamp_stock_updated_at(self):
+        stamped = self.low_stock_product.stock_updated_at
+        product = Product.objects.get(pk=self.low_stock_product.pk)
+        product.price = 90
+        product.save()
+        self.assertEqual(product.stock_updated_at, stamped)
+        product.stock = 8
+        product.save()
+        self.assertGreater(Product.objects.get(pk=product.pk).stock_updated_at, stamped)
+
+    def test_alerts_only_on_threshold_crossings(self):
+        from django.core import mail
+        from orders.checkout import place_order
+        from .models import LowStockAlert
+        from .utils import notify_low_stock_crossings
+
+        self.supplier.email = 'supplier@example.com'
+        self.supplier.save()
+        customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        mail.outbox = []
+
+        self.assertEqual(notify_low_stock_crossings()['alerts'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(LowStockAlert.objects.get().stock, 3)
+
+        # Still low: no repeat, and unchanged products are not read at all
+        self.assertEqual(notify_low_stock_crossings(overlap=0)['checked'], 0)
+        place_order(customer, [{'product': self.low_stock_product, 'quantity': 1}])
+        self.assertEqual(notify_low_stock_crossings()['alerts'], 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+        # Recovery clears the alert, the next fall alerts again
+        product = Product.objects.get(pk=self.low_stock_product.pk)
+        product.stock = 20
+        product.save()
+        self.assertEqual(notify_low_stock_crossings()['recovered'], 1)
+        self.assertFalse(LowStockAlert.objects.exists())
+        place_order(customer, [{'product': product, 'quantity': 18}])
+        self.assertEqual(notify_low_stock_crossings()['alerts'], 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Low Stock Item (Stock: 2)', mail.outbox[1].body)
+
+class ProductExportTestCase(APITestCase):
+    """Test streaming product exports"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        category = Category.objects.create(name='Electronics')
+        Product.objects.create(name='Phone', category=category, price=300, stock=10, reserved=3, supplier=self.supplier)
+        Product.objects.create(name='Charger', category=category, price=20, stock=0, supplier=self.supplier)
+
+    def export(self, **params):
+        response = self.client.get('/products/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        import csv
+
+        self.client.force_authenticate(user=self.supplier)
+        response = self.client.get('/products/export/')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="products.csv"')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['name'] for row in rows], ['Charger', 'Phone'])
+        self.assertEqual((rows[1]['category'], rows[1]['available']), ('Electronics', '7'))
+
+    def test_export_honours_list_scoping_and_filters(self):
+        import json
+
+        self.client.force_authenticate(user=self.customer)
+        records = [json.loads(line) for line in self.export(export_format='jsonl').splitlines()]
+        self.assertEqual([record['name'] for record in records], ['Phone'])
+
+        self.client.force_authenticate(user=self.supplier)
+        records = [json.loads(line) for line in self.export(export_format='jsonl', ordering='price').splitlines()]
+        self.assertEqual([record['name'] for record in records], ['Charger', 'Phone'])
+        self.assertEqual(len(self.export(search='charger').splitlines()), 2)  # header and one row
+
+    def test_csv_export_neutralises_formulas(self):
+        import csv
+        import json
+
+        Product.objects.filter(name='Charger').update(name='=HYPERLINK("http://evil.example","x")')
+        self.client.force_authenticate(user=self.supplier)
+        rows = list(csv.DictReader(self.export().splitlines()))
+        self.assertEqual(rows[0]['name'], '\'=HYPERLINK("http://evil.example","x")')
+        self.assertEqual(rows[1]['name'], 'Phone')
+        # JSON Lines is data, not a spreadsheet, and stays verbatim
+        records = [json.loads(line) for line in self.export(export_format='jsonl').splitlines()]
+        self.assertEqual(records[0]['name'], '=HYPERLINK("http://evil.example","x")')
+
+class ProductImportTestCase(QueryBudgetMixin, APITestCase):
+    """Test bulk catalogue imports"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        Category.objects.create(name='Electronics')
+        Category.objects.create(name='Books')
+        self.client.force_authenticate(user=self.supplier)
+
+    def upload(self, content, name='catalogue.csv', **params):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        url = '/products/import/' + (f"?import_format={params['import_format']}" if params else '')
+        return self.client.post(url, {'file': SimpleUploadedFile(name, content.encode())}, format='multipart')
+
+    def test_csv_import_upserts_on_sku(self):
+        response = self.upload(
+            "sku,name,description,category,price,stock\n"
+            "PH-1,Phone,Smart,electronics,300.00,10\n"
+            "BK-1,Novel,,Books,12.5,3\n"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['errors']), (2, 0, []))
+
+        response = self.upload("sku,name,category,price,stock\nPH-1,Phone 2,Electronics,280,7\n")
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        phone = Product.objects.get(supplier=self.supplier, sku='PH-1')
+        self.assertEqual((phone.name, phone.price, phone.stock, phone.version), ('Phone 2', 280, 7, 2))
+        self.assertEqual(
+            list(phone.movements.order_by('id').values_list('kind', 'quantity')), [('restock', 10), ('adjustment', -3)]
+        )
+        self.assertEqual(self.supplier.supplier_stats.product_count, 2)
+
+    def test_rows_are_reported_individually(self):
+        response = self.upload(
+            "sku,name,category,price,stock\n"
+            "A,Good,Books,10,1\n"
+            "B,Bad category,Toys,10,1\n"
+            "C,Bad price,Books,ten,1\n"
+            "A,Duplicate,Books,10,1\n"
+            ",No sku,Books,10,-1\n"
+        )
+        self.assertEqual(response.data['created'], 1)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(errors[3], {'category': ['Unknown category "Toys".']})
+        self.assertIn('price', errors[4])
+        self.assertEqual(errors[5], {'sku': ['Duplicate of row 2.']})
+        self.assertEqual(sorted(errors[6]), ['sku', 'stock'])
+
+    def test_import_keeps_reserved_units_covered(self):
+        self.upload("sku,name,category,price,stock\nA,Phone,Books,10,5\nB,Case,Books,10,5\n")
+        Product.objects.filter(sku='A').update(reserved=4)
+        response = self.upload("sku,name,category,price,stock\nA,Phone,Books,10,3\nB,Case,Books,10,1\n")
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['errors'], [
+            {'row': 2, 'sku': 'A', 'errors': {'stock': ["Stock cannot go below the 4 units reserved."]}}
+        ])
+        self.assertEqual(dict(Product.objects.values_list('sku', 'stock')), {'A': 5, 'B': 1})
+
+    def test_jsonl_import_in_constant_queries(self):
+        import json
+
+        lines = ''.join(
+            json.dumps({'sku': f'SKU-{n}', 'name': f'Item {n}', 'category': 'Books', 'price': '5.00', 'stock': n}) + '\n'
+            for n in range(200)
+        ) + 'not json\n'
+        with self.assertQueryBudget(11):
+            response = self.upload(lines, name='catalogue.jsonl')
+        self.assertEqual((response.data['rows'], response.data['created']), (201, 200))
+        self.assertEqual(response.data['errors'], [{'row': 201, 'sku': None, 'errors': {'row': ['Not a valid record.']}}])
+        self.assertEqual(Product.objects.filter(supplier=self.supplier).count(), 200)
+
+    def test_stock_must_be_a_whole_number(self):
+        import json
+
+        stocks = [1.7, True, '2.0', ' 4 ', 5, '']
+        lines = ''.join(
+            json.dumps({'sku': f'S-{n}', 'name': 'Item', 'category': 'Books', 'price': '1.00', 'stock': stock}) + '\n'
+            for n, stock in enumerate(stocks)
+        )
+        response = self.upload(lines, name='catalogue.jsonl')
+        self.assertEqual([error['row'] for error in response.data['errors'] if 'stock' in error['errors']], [1, 2, 3])
+        self.assertEqual(
+            sorted(Product.objects.filter(supplier=self.supplier).values_list('sku', 'stock')),
+            [('S-3', 4), ('S-4', 5), ('S-5', 0)]
+        )
+
+    def test_import_command(self):
+        import tempfile
+        from django.core.management import call_command
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write("sku,name,category,price,stock\nPH-1,Phone,Electronics,300,4\n")
+        out = StringIO()
+        call_command('import_products', f.name, '--supplier', 'supplier', stdout=out)
+        self.assertIn('1 created, 0 updated, 0 rejected', out.getvalue())
+        self.assertTrue(Product.objects.filter(sku='PH-1', stock=4).exists())
+
+    def test_only_suppliers_import_and_skus_stay_unique(self):
+        customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.upload("sku,name,category,price,stock\nPH-1,Phone,Electronics,300,4\n")
+        response = self.client.post('/products/', {
+            'sku': 'PH-1', 'name': 'Clash', 'category_id': Category.objects.get(name='Books').id, 'price': 5, 'stock': 1,
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sku', response.data)
+
+        self.client.force_authenticate(user=customer)
+        response = self.upload("sku,name,category,price,stock\n")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+class ProductBulkUpdateTestCase(QueryBudgetMixin, APITestCase):
+    """Test bulk stock and price updates"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        other = User.objects.create_user(username='other', password='other123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        self.products = [
+            Product.objects.create(name=f'Item {n}', category=category, price=10, stock=5, supplier=self.supplier)
+            for n in range(4)
+        ]
+        self.foreign = Product.objects.create(name='Theirs', category=category, price=10, stock=5, supplier=other)
+        self.client.force_authenticate(user=self.supplier)
+
+    def patch(self, items):
+        return self.client.patch('/products/bulk/', items, format='json')
+
+    def test_outcome_per_id(self):
+        first, second, third, fourth = self.products
+        Product.objects.filter(pk=fourth.pk).update(version=2)
+        response = self.patch([
+            {'id': first.id, 'stock': 20, 'price': '12.50'},
+            {'id': second.id, 'stock_delta': -6},
+            {'id': third.id, 'price': '10.00'},
+            {'id': fourth.id, 'stock_delta': 1, 'version': 1},
+            {'id': self.foreign.id, 'stock': 0},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(
+            [result['result'] for result in response.data['results']],
+            ['updated', 'invalid', 'unchanged', 'conflict', 'not_found']
+        )
+        first.refresh_from_db()
+        self.assertEqual((first.stock, first.price, first.version), (20, Decimal('12.50'), 2))
+        self.assertEqual(first.movements.filter(reference='bulk').get().quantity, 15)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.stock, 5)
+
+    def test_stock_cannot_drop_below_reserved_units(self):
+        first, second = self.products[:2]
+        Product.objects.filter(pk__in=[first.pk, second.pk]).update(reserved=4)
+        response = self.patch([{'id': first.id, 'stock': 3}, {'id': second.id, 'stock_delta': -1}])
+        self.assertEqual([result['result'] for result in response.data['results']], ['invalid', 'updated'])
+        self.assertIn('4 units reserved', response.data['results'][0]['detail'])
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 5)
+
+    def test_update_runs_constant_queries(self):
+        items = [{'id': product.id, 'stock_delta': -2, 'price': '11.00'} for product in self.products]
+        with self.assertQueryBudget(7):
+            response = self.patch(items)
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(set(Product.objects.filter(supplier=self.supplier).values_list('stock', 'version')), {(3, 2)})
+        self.assertEqual(self.supplier.supplier_stats.low_stock_count, 4)
+
+    def test_invalid_requests(self):
+        product = self.products[0]
+        response = self.patch([{'id': product.id, 'stock': 1, 'stock_delta': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.patch([{'id': product.id, 'stock': 1}, {'id': product.id, 'price': 1}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=User.objects.create_user(username='c', password='c', role='customer'))
+        self.assertEqual(self.patch([{'id': product.id, 'stock': 1}]).status_code, status.HTTP_403_FORBIDDEN)
+
+class ProductBatchTestCase(QueryBudgetMixin, APITestCase):
+    """Test fetching many products by id"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        other = User.objects.create_user(username='other', password='other123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        self.mine = [
+            Product.objects.create(name=f'Item {n}', category=category, price=10, stock=5, supplier=self.supplier)
+            for n in range(3)
+        ]
+        self.theirs = Product.objects.create(name='Theirs', category=category, price=10, stock=5, supplier=other)
+
+    def test_results_follow_request_order_in_one_query(self):
+        self.client.force_authenticate(user=self.customer)
+        ids = [self.mine[2].id, 9999, self.theirs.id, self.mine[0].id, self.mine[2].id]
+        with self.assertQueryBudget(1):
+            response = self.client.get('/products/batch/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual([result['id'] for result in results], ids[:4])
+        self.assertEqual(results[1], {'id': 9999, 'not_found': True})
+        self.assertEqual(results[0]['category']['name'], 'Electronics')
+
+    def test_suppliers_only_see_their_own(self):
+        self.client.force_authenticate(user=self.supplier)
+        response = self.client.get('/products/batch/', {'ids': f'{self.theirs.id},{self.mine[0].id}'})
+        self.assertTrue(response.data['results'][0]['not_found'])
+        self.assertEqual(response.data['results'][1]['name'], 'Item 0')
+
+    def test_invalid_id_lists(self):
+        self.client.force_authenticate(user=self.customer)
+        for ids in ('', '1,x', ','.join(str(n) for n in range(1, 502))):
+            response = self.client.get('/products/batch/', {'ids': ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ProductQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Test product endpoints run a fixed number of queries regardless of page size"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        for i in range(10):
+            category = Category.objects.create(name=f'Category {i}')
+            Product.objects.create(
+                name=f'Product {i}', category=category, price=10, stock=i, supplier=self.supplier
+            )
+        self.product = Product.objects.first()
+    
+    def test_product_list_budget(self):
+        self.client.force_authenticate(user=self.customer)
+        with self.assertQueryBudget(2):
+            response = self.client.get('/products/')
+        self.assertEqual(len(response.data['results']), 9)
+        
+        with self.assertQueryBudget(1):
+            self.client.get('/products/?cursor=')
+    
+    def test_product_create_budget(self):
+        self.client.force_authenticate(user=self.supplier)
+        data = {'name': 'New', 'category_id': self.product.category_id, 'price': 5, 'stock': 1}
+        with self.assertQueryBudget(5):
+            response = self.client.post('/products/', data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_product_detail_budget(self):
+        self.client.force_authenticate(user=self.supplier)
+        with self.assertQueryBudget(1):
+            self.client.get(f'/products/{self.product.id}/')
+        with self.assertQueryBudget(5):
+            response = self.client.patch(f'/products/{self.product.id}/', {'stock': 50})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertQueryBudget(10):
+            self.client.delete(f'/products/{self.product.id}/')
+    
+    def test_category_list_budget(self):
+        self.client.force_authenticate(user=self.customer)
+        with self.assertQueryBudget(2):
+            self.client.get('/products/categories/')
+    
+    def test_supplier_dashboard_budget(self):
+        self.client.force_authenticate(user=self.supplier)
+        with self.assertQueryBudget(2):
+            self.client.get('/products/dashboard/')
+
+
+class ProductQueryPlanTestCase(QueryPlanMixin, TestCase):
+    """Product list queries are answered from indexes"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+
+    def test_supplier_list_uses_supplier_index(self):
+        from .views import ProductListCreateView
+
+        self.assertUsesIndex(self.list_queryset(ProductListCreateView, self.supplier), 'product_supplier_id_idx')
+
+    def test_customer_list_uses_in_stock_index(self):
+        from .views import ProductListCreateView
+
+        self.assertUsesIndex(self.list_queryset(ProductListCreateView, self.customer), 'product_in_stock_idx')
+
+    def test_low_stock_uses_stock_index(self):
+        from .utils import low_stock_products
+
+        self.assertUsesIndex(low_stock_products(5), 'product_stock_idx')
+
+    def test_changed_stock_scan_uses_stock_updated_index(self):
+        from django.utils import timezone
+        from .utils import changed_products
+
+        now = timezone.now()
+        self.assertUsesIndex(changed_products(now, since=now), 'product_stock_updated_idx')
+
+
+class StockReservationTestCase(APITestCase):
+    """Test time-boxed stock reservations"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.rival = User.objects.create_user(username='rival', password='customer123', role='customer')
+        category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(name='Console', category=category, price=500, stock=5, supplier=self.supplier)
+
+    def reserve(self, user, quantity):
+        self.client.force_authenticate(user=user)
+        return self.client.post(
+            '/products/reservations/', {'items': [{'product': self.product.id, 'quantity': quantity}]}, format='json'
+        )
+
+    def order(self, user, quantity):
+        self.client.force_authenticate(user=user)
+        return self.client.post('/orders/', {'items': [{'product': self.product.id, 'quantity': quantity}]}, format='json')
+
+    def test_reservation_holds_stock_from_others(self):
+        self.assertEqual(self.reserve(self.customer, 3).status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved, self.product.available), (5, 3, 2))
+
+        response = self.reserve(self.rival, 3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('available: 2', str(response.data))
+        self.assertEqual(self.order(self.rival, 3).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.order(self.rival, 2).status_code, status.HTTP_201_CREATED)
+
+    def test_supplier_cannot_cut_stock_below_reservations(self):
+        self.reserve(self.customer, 4)
+        self.client.force_authenticate(user=self.supplier)
+        response = self.client.patch(f'/products/{self.product.id}/', {'stock': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('stock', response.data)
+        response = self.client.post(f'/products/{self.product.id}/movements/', {'kind': 'adjustment', 'quantity': -2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.patch(f'/products/{self.product.id}/', {'stock': 4}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.order(self.customer, 4).status_code, status.HTTP_201_CREATED)
+
+    def test_checkout_consumes_reservation(self):
+        from .models import StockReservation
+
+        self.reserve(self.customer, 4)
+        Product.objects.filter(pk=self.product.pk).update(stock=4)  # everything else sold
+        self.assertEqual(self.order(self.customer, 3).status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved), (1, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_and_expiry_return_stock(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models import StockReservation
+
+        reservation_id = self.reserve(self.customer, 2).data[0]['id']
+        self.reserve(self.rival, 3)
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self.client.delete(f'/products/reservations/{reservation_id}/').status_code, status.HTTP_204_NO_CONTENT)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('release_expired_reservations', stdout=out)
+        self.assertIn('Released 1 expired', out.getvalue())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.reserved, 0)
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class InventoryLedgerTestCase(APITestCase):
+    """Test the append-only inventory ledger and stock-at-time queries"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(name='Phone', category=category, price=300, stock=10, supplier=self.supplier)
+
+    def ledger(self):
+        return list(self.product.movements.order_by('id').values_list('kind', 'quantity', 'applied'))
+
+    def test_every_stock_write_is_logged(self):
+        from orders.checkout import place_order
+
+        self.client.force_authenticate(user=self.supplier)
+        self.client.patch(f'/products/{self.product.id}/', {'stock': 12})
+        place_order(self.customer, [{'product': self.product, 'quantity': 3}])
+        self.assertEqual(self.ledger(), [('restock', 10, True), ('adjustment', 2, True), ('sale', -3, True)])
+
+    def test_restock_is_folded_by_compaction(self):
+        from django.core.management import call_command
+
+        self.client.force_authenticate(user=self.supplier)
+        for quantity in (5, 7):
+            response = self.client.post(f'/products/{self.product.id}/movements/', {'kind': 'restock', 'quantity': quantity})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertFalse(response.data['applied'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+        out = StringIO()
+        call_command('compact_inventory_ledger', stdout=out)
+        self.assertIn('Folded 2 movements', out.getvalue())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 22)
+        self.assertEqual(self.product.stock_snapshots.get().stock, 22)
+
+    def test_adjustment_cannot_go_negative(self):
+        self.client.force_authenticate(user=self.supplier)
+        response = self.client.post(f'/products/{self.product.id}/movements/', {'kind': 'adjustment', 'quantity': -11})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(f'/products/{self.product.id}/movements/', {'kind': 'adjustment', 'quantity': -4})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 6)
+
+    def test_stock_at_time(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .inventory import compact, restock
+        from .models import InventoryMovement
+
+        start = timezone.now() - timedelta(days=3)
+        InventoryMovement.objects.filter(product=self.product).update(created_at=start)
+        restock(self.product, 5)
+        InventoryMovement.objects.filter(applied=False).update(created_at=start + timedelta(days=1))
+        compact()
+        Product.objects.filter(pk=self.product.pk).update(stock=13)
+        InventoryMovement.objects.create(product=self.product, kind='adjustment', quantity=-2)
+
+        self.client.force_authenticate(user=self.supplier)
+        def stock_at(moment):
+            response = self.client.get(f'/products/{self.product.id}/stock-at/', {'at': moment.isoformat()})
+            return response.data['stock']
+        self.assertEqual(stock_at(start - timedelta(days=1)), 0)
+        self.assertEqual(stock_at(start + timedelta(hours=1)), 10)
+        self.assertEqual(stock_at(start + timedelta(days=2)), 15)
+        self.assertEqual(stock_at(timezone.now() + timedelta(minutes=1)), 13)
+        self.assertEqual(self.client.get(f'/products/{self.product.id}/stock-at/').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f'/products/{self.product.id}/stock-at/', {'at': '2024-13-45T00:00:00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('at', response.data)
+
+        # Stock history is the supplier's business, not every customer's
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(f'/products/{self.product.id}/stock-at/', {'at': start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ProductConcurrencyTestCase(APITestCase):
+    """Test optimistic concurrency on product writes"""
+
+    def setUp(self):
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        category = Category.objects.create(name='Electronics')
+        self.product = Product.objects.create(name='Phone', category=category, price=300, stock=10, supplier=self.supplier)
+        self.client.force_authenticate(user=self.supplier)
+
+    def test_etag_tracks_version(self):
+        response = self.client.get(f'/products/{self.product.id}/')
+        self.assertEqual(response['ETag'], '"1"')
+        response = self.client.patch(f'/products/{self.product.id}/', {'price': 250}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(response.data['version'], 2)
+
+    def test_stale_if_match_is_rejected(self):
+        from orders.checkout import place_order
+
+        etag = self.client.get(f'/products/{self.product.id}/')['ETag']
+        place_order(self.customer, [{'product': self.product, 'quantity': 3}])
+        response = self.client.patch(f'/products/{self.product.id}/', {'stock': 20}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(f'/products/{self.product.id}/', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+    def test_stale_save_does_not_overwrite(self):
+        from django.db import transaction
+        from ecommerce.versioning import ConcurrentUpdateError
+
+        first = Product.objects.get(pk=self.product.pk)
+        second = Product.objects.get(pk=self.product.pk)
+        first.price = 250
+        first.save()
+        second.stock = 20
+        with self.assertRaises(ConcurrentUpdateError), transaction.atomic():
+            second.save()
+        second.refresh_from_db()
+        self.assertEqual((second.price, second.stock, second.version), (250, 10, 2))
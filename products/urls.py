@@ -1,9 +1,21 @@
 from django.urls import path
-from .views import ProductListCreateView, ProductRetrieveUpdateDestroyView, CategoryListCreateView, SupplierDashboardView
+from .views import (
+    ProductListCreateView, ProductRetrieveUpdateDestroyView, CategoryListCreateView, SupplierDashboardView,
+    StockReservationListCreateView, StockReservationDestroyView, ProductMovementListCreateView, ProductStockAtView,
+    ProductExportView, ProductImportView, ProductBulkUpdateView, ProductBatchView,
+)
 
 urlpatterns = [
     path('dashboard/', SupplierDashboardView.as_view(), name='supplier-dashboard'),
     path('categories/', CategoryListCreateView.as_view(), name='category-list'),
+    path('reservations/', StockReservationListCreateView.as_view(), name='reservation-list-create'),
+    path('reservations/<int:pk>/', StockReservationDestroyView.as_view(), name='reservation-detail'),
+    path('export/', ProductExportView.as_view(), name='product-export'),
+    path('import/', ProductImportView.as_view(), name='product-import'),
+    path('bulk/', ProductBulkUpdateView.as_view(), name='product-bulk-update'),
+    path('batch/', ProductBatchView.as_view(), name='product-batch'),
     path('', ProductListCreateView.as_view(), name='product-list-create'),
     path('<int:pk>/', ProductRetrieveUpdateDestroyView.as_view(), name='product-detail'),
+    path('<int:pk>/movements/', ProductMovementListCreateView.as_view(), name='product-movements'),
+    path('<int:pk>/stock-at/', ProductStockAtView.as_view(), name='product-stock-at'),
 ]
\ No newline at end of file
@@ -1,17 +1,153 @@
-from django.core.mail import send_mail
-from .models import Product
-from users.models import User
-
-def batch_notify_low_stock():
-    # Find all suppliers with low-stock products
-    suppliers = User.objects.filter(role='supplier')
-    for supplier in suppliers:
-        low_stock_products = Product.objects.filter(supplier=supplier, stock__lt=5)
-        if low_stock_products.exists():
-            product_list = "\n".join([f"{p.name} (Stock: {p.stock})" for p in low_stock_products])
-            send_mail(
-                subject="Low Stock Alert",
-                message=f"Dear {supplier.username},\n\nThe following products are low in stock:\n{product_list}\n\nPlease restock soon.",
-                from_email="noreply@ecommerce.com",
-                recipient_list=[supplier.email],
-            )
\ No newline at end of file
+from datetime import timedelta
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.core.mail import get_connection, send_mass_mail
+from django.db import transaction
+from django.utils import timezone
+from .models import LowStockAlert, LowStockScan, Product
+from .stats import LOW_STOCK_THRESHOLD
+
+DEFAULT_CHUNK_SIZE = 500
+# Seconds of changes before the last watermark rescanned on each run, for
+# stock writes stamped before it but committed after the run read them
+DEFAULT_OVERLAP = 60
+
+
+def low_stock_products(threshold=LOW_STOCK_THRESHOLD):
+    return Product.objects.filter(stock__lt=threshold, supplier__role='supplier')
+
+
+def changed_products(until, since=None):
+    """Suppliers' products whose stock changed after since (if given) and up to until."""
+    changed = Product.objects.filter(supplier__role='supplier', stock_updated_at__lte=until)
+    if since is not None:
+        changed = changed.filter(stock_updated_at__gt=since)
+    return changed
+
+
+def low_stock_groups(threshold=LOW_STOCK_THRESHOLD):
+    """
+    Stream (username, email, [(name, stock), ...]) per supplier with
+    low-stock products, from a single query ordered by supplier.
+    """
+    rows = (
+        low_stock_products(threshold)
+        .order_by('supplier_id', 'id')
+        .values_list('supplier_id', 'supplier__username', 'supplier__email', 'name', 'stock')
+        .iterator(chunk_size=2000)
+    )
+    for _, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        yield group[0][1], group[0][2], [(name, stock) for *_, name, stock in group]
+
+
+def low_stock_message(username, email, products):
+    product_list = "\n".join(f"{name} (Stock: {stock})" for name, stock in products)
+    return (
+        "Low Stock Alert",
+        f"Dear {username},\n\nThe following products are low in stock:\n{product_list}\n\nPlease restock soon.",
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+    )
+
+
+def send_in_chunks(messages, chunk_size=DEFAULT_CHUNK_SIZE, connection=None):
+    """send_mass_mail an iterable of messages chunk_size at a time over one connection."""
+    sent = 0
+    connection = connection or get_connection()
+    with connection:
+        while chunk := list(islice(messages, chunk_size)):
+            sent += send_mass_mail(chunk, connection=connection)
+    return sent
+
+
+def batch_notify_low_stock(threshold=LOW_STOCK_THRESHOLD, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False,
+                           connection=None):
+    """
+    Email every supplier a list of their products below threshold.
+
+    Messages are sent with send_mass_mail in chunks of chunk_size over one
+    mail connection. Suppliers without an email address are skipped. With
+    dry_run nothing is sent. Returns a dict of counts.
+    """
+    counts = {'suppliers': 0, 'products': 0, 'sent': 0, 'skipped': 0}
+
+    def messages():
+        for username, email, products in low_stock_groups(threshold):
+            counts['suppliers'] += 1
+            counts['products'] += len(products)
+            if not email:
+                counts['skipped'] += 1
+                continue
+            yield low_stock_message(username, email, products)
+
+    if dry_run:
+        for _ in messages():
+            pass
+    else:
+        counts['sent'] = send_in_chunks(messages(), chunk_size, connection)
+    return counts
+
+
+def notify_low_stock_crossings(threshold=LOW_STOCK_THRESHOLD, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False,
+                               connection=None, overlap=DEFAULT_OVERLAP):
+    """
+    Alert suppliers about products that fell below threshold since the last
+    run, once per fall.
+
+    Only products whose stock_updated_at moved past the last LowStockScan
+    are read, so a run costs O(changes), not O(catalogue). A product alerts
+    when it is low and has no LowStockAlert; its alert is deleted once it is
+    back at or above the threshold. Returns a dict of counts.
+    """
+    now = timezone.now()
+    last_scan = LowStockScan.objects.order_by('-scanned_until').values_list('scanned_until', flat=True).first()
+    since = last_scan - timedelta(seconds=overlap) if last_scan is not None else None
+    rows = (
+        changed_products(now, since).order_by('supplier_id', 'id')
+        .values_list('supplier_id', 'supplier__username', 'supplier__email', 'id', 'name', 'stock',
+                     'low_stock_alert__stock')
+        .iterator(chunk_size=2000)
+    )
+
+    counts = {'checked': 0, 'alerts': 0, 'recovered': 0, 'suppliers': 0, 'sent': 0, 'skipped': 0}
+    new_alerts = []
+    recovered = []
+
+    def messages():
+        for _, group in groupby(rows, key=lambda row: row[0]):
+            products = []
+            for _, username, email, product_id, name, stock, alerted_stock in group:
+                counts['checked'] += 1
+                if stock < threshold and alerted_stock is None:
+                    new_alerts.append(LowStockAlert(product_id=product_id, stock=stock, alerted_at=now))
+                    products.append((name, stock))
+                elif stock >= threshold and alerted_stock is not None:
+                    recovered.append(product_id)
+            if not products:
+                continue
+            counts['suppliers'] += 1
+            if not email:
+                counts['skipped'] += 1
+                continue
+            yield low_stock_message(username, email, products)
+
+    if dry_run:
+        for _ in messages():
+            pass
+    else:
+        counts['sent'] = send_in_chunks(messages(), chunk_size, connection)
+    counts['alerts'] = len(new_alerts)
+    counts['recovered'] = len(recovered)
+    if dry_run:
+        return counts
+
+    with transaction.atomic():
+        LowStockAlert.objects.bulk_create(new_alerts, ignore_conflicts=True)
+        LowStockAlert.objects.filter(pk__in=recovered).delete()
+        LowStockScan.objects.create(
+            scanned_until=now, products_checked=counts['checked'],
+            alerts=counts['alerts'], recovered=counts['recovered'],
+        )
+    return counts
@@ -1,13 +1,24 @@
-from rest_framework import generics, filters, permissions
+from rest_framework import generics, filters, permissions, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
-from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer
+from ecommerce.export import chunked_rows, export_response
+from ecommerce.pagination import HybridPagination
+from ecommerce.versioning import ConditionalUpdateMixin
+from . import bulk, imports, inventory, reservations
+from .models import InventoryMovement, Product, Category, StockReservation
+from .serializers import (
+    ProductSerializer, CategorySerializer, InventoryMovementSerializer, ProductBulkUpdateSerializer,
+    ReservationRequestSerializer, StockReservationSerializer,
+)
 from .analytics import get_supplier_dashboard_stats
+from .search import ProductSearchFilter
 
-class ProductPagination(PageNumberPagination):
+class ProductPagination(HybridPagination):
     page_size = 10
 
 
@@ -31,10 +42,10 @@ class ProductListCreateView(generics.ListCreateAPIView):
     List all products or create a new product.
     Filtering by name, category, and price is supported.
     """
-    queryset = Product.objects.all().order_by('-id')
+    queryset = Product.objects.select_related('category', 'supplier').order_by('-id')
     serializer_class = ProductSerializer
     pagination_class = ProductPagination
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter,DjangoFilterBackend]
+    filter_backends = [ProductSearchFilter, filters.OrderingFilter,DjangoFilterBackend]
     search_fields = ['name', 'description']
     filterset_fields = ['category', 'price']
     ordering_fields = ['price', 'stock']
@@ -55,12 +66,83 @@ class ProductListCreateView(generics.ListCreateAPIView):
         # Automatically set the supplier to the current authenticated user
         serializer.save(supplier=self.request.user)
 
-class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class ProductExportView(ProductListCreateView):
+    """
+    Stream every product the list view would show as CSV or JSON Lines
+    (?export_format=csv|jsonl), with the same search and filters.
+    """
+    http_method_names = ['get', 'head', 'options']
+    export_fields = ['id', 'name', 'description', 'category', 'price', 'stock', 'available', 'supplier']
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return export_response(request, 'products', self.export_fields, self.export_records(queryset))
+
+    def export_records(self, queryset):
+        columns = ['id', 'name', 'description', 'category__name', 'price', 'stock', 'reserved', 'supplier__username']
+        for chunk in chunked_rows(queryset, columns):
+            for pk, name, description, category, price, stock, reserved, supplier in chunk:
+                yield {
+                    'id': pk, 'name': name, 'description': description, 'category': category,
+                    'price': price, 'stock': stock, 'available': stock - reserved, 'supplier': supplier,
+                }
+
+class ProductImportView(APIView):
+    """
+    Upsert the supplier's catalogue from an uploaded CSV or JSON Lines file
+    (multipart field "file"; columns sku, name, description, category, price,
+    stock), keyed on sku. The format follows the file extension unless
+    ?import_format=csv|jsonl is given. Responds with counts and the rows
+    that were rejected.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        if request.user.role != 'supplier':
+            return Response({"detail": "Only suppliers can import products."}, status=status.HTTP_403_FORBIDDEN)
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"file": ["Upload a CSV or JSON Lines file."]}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.query_params.get('import_format') or imports.guess_format(upload.name)
+        if import_format not in imports.FORMATS:
+            return Response(
+                {"import_format": [f"Choose one of: {', '.join(imports.FORMATS)}."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        report = imports.import_products(request.user, imports.read_records(upload, import_format))
+        return Response(report)
+
+class ProductBulkUpdateView(APIView):
+    """
+    Update the stock and/or price of many products in one transaction:
+    [{"id": 1, "stock": 10 or "stock_delta": 5, "price": "9.99", "version": 3}].
+    Suppliers can only update their own products. Reports an outcome per id.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def patch(self, request):
+        user = request.user
+        if user.role == 'supplier':
+            queryset = Product.objects.filter(supplier=user)
+        elif user.role == 'admin' or user.is_staff:
+            queryset = Product.objects.all()
+        else:
+            return Response({"detail": "Only suppliers can update products."}, status=status.HTTP_403_FORBIDDEN)
+        serializer = ProductBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk.apply_updates(queryset, serializer.validated_data)
+        return Response({
+            'updated': sum(result['result'] == 'updated' for result in results),
+            'results': results,
+        })
+
+class ProductRetrieveUpdateDestroyView(ConditionalUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a product.
     Suppliers can only manage their own products.
     """
-    queryset = Product.objects.all().order_by('-id')
+    queryset = Product.objects.select_related('category', 'supplier').order_by('-id')
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -71,6 +153,129 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             return queryset.filter(supplier=user)
         return queryset
 
+class ProductBatchView(generics.GenericAPIView):
+    """
+    Fetch up to max_ids products in one query: GET ?ids=3,1,2. Results
+    follow the requested order; ids that do not exist (or belong to another
+    supplier) come back as {"id": n, "not_found": true}.
+    """
+    queryset = Product.objects.select_related('category', 'supplier')
+    serializer_class = ProductSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    max_ids = 500
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = super().get_queryset()
+        if user.role == "supplier":
+            return queryset.filter(supplier=user)
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()))
+        except ValueError:
+            return Response({"ids": ["Provide a comma-separated list of product ids."]}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > self.max_ids:
+            return Response(
+                {"ids": [f"Provide between 1 and {self.max_ids} product ids."]}, status=status.HTTP_400_BAD_REQUEST
+            )
+        products = self.get_queryset().in_bulk(ids)
+        found = dict(zip(products, self.get_serializer(list(products.values()), many=True).data))
+        return Response({'results': [found.get(pk, {'id': pk, 'not_found': True}) for pk in ids]})
+
 class CategoryListCreateView(generics.ListCreateAPIView):
     queryset = Category.objects.all().order_by('-id')
-    serializer_class = CategorySerializer
\ No newline at end of file
+    serializer_class = CategorySerializer
+
+
+class StockReservationListCreateView(generics.ListCreateAPIView):
+    """
+    List the customer's active stock reservations, or reserve stock for a
+    cart: {"items": [{"product": id, "quantity": n}]}. Reservations expire
+    after STOCK_RESERVATION_TTL seconds and are consumed at checkout.
+    """
+    serializer_class = StockReservationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return (
+            StockReservation.objects.select_related('product')
+            .filter(customer=self.request.user, expires_at__gt=timezone.now())
+            .order_by('expires_at')
+        )
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role != 'customer':
+            return Response({"detail": "Only customers can reserve stock."}, status=status.HTTP_403_FORBIDDEN)
+        serializer = ReservationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        held = reservations.reserve(request.user, serializer.validated_data['items'])
+        return Response(StockReservationSerializer(held, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class StockReservationDestroyView(generics.DestroyAPIView):
+    """
+    Release a reservation before it expires.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return StockReservation.objects.filter(customer=self.request.user)
+
+    def perform_destroy(self, instance):
+        reservations.release([instance])
+
+
+class SuppliedProductMixin:
+    """
+    get_product(): the product in the URL, visible only to its supplier and admins.
+    """
+
+    def get_product(self):
+        user = self.request.user
+        products = Product.objects.all()
+        if user.role != 'admin':
+            products = products.filter(supplier=user)
+        return get_object_or_404(products, pk=self.kwargs['pk'])
+
+
+class ProductMovementListCreateView(SuppliedProductMixin, generics.ListCreateAPIView):
+    """
+    A product's inventory ledger, newest first (supplier of the product or admin).
+    POST {"kind": "restock", "quantity": n} queues a restock without locking
+    the product; "adjustment" applies a signed correction immediately.
+    """
+    serializer_class = InventoryMovementSerializer
+    pagination_class = ProductPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return InventoryMovement.objects.filter(product=self.get_product()).order_by('-id')
+
+    def perform_create(self, serializer):
+        product = self.get_product()
+        reference = f'user:{self.request.user.pk}'
+        record = inventory.restock if serializer.validated_data['kind'] == 'restock' else inventory.adjust
+        serializer.instance = record(product, serializer.validated_data['quantity'], reference)
+
+
+class ProductStockAtView(SuppliedProductMixin, APIView):
+    """
+    Stock of a product at a point in time (supplier of the product or admin):
+    GET ?at=<ISO 8601 datetime>.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        product = self.get_product()
+        try:
+            at = parse_datetime(request.query_params.get('at', ''))
+        except ValueError:  # well-formed but impossible, e.g. month 13
+            at = None
+        if at is None:
+            return Response({"at": ["Provide an ISO 8601 datetime."]}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        return Response({'product': product.pk, 'at': at, 'stock': inventory.stock_at(product, at)})
@@ -1,25 +1,34 @@
-from orders.models import Order, OrderItem
+from orders.models import DailyOrderStats, DailyProductSales
 from products.models import Product
 from .models import User
-from django.db.models import Sum, Count
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
 
 def get_admin_dashboard_stats():
+    # Order figures come from the daily rollups, so their cost tracks the
+    # number of days rather than the number of orders.
+    delivered = DailyOrderStats.objects.filter(status='delivered')
+
     # Total revenue from delivered orders
-    total_revenue = Order.objects.filter(status='delivered').aggregate(sum=Sum('total_price'))['sum'] or 0
+    total_revenue = delivered.aggregate(sum=Sum('revenue'))['sum'] or 0
 
     # Orders by status
-    order_status_counts = Order.objects.values('status').annotate(count=Count('id'))
+    order_status_counts = (
+        DailyOrderStats.objects.values('status')
+        .annotate(count=Sum('order_count'))
+        .filter(count__gt=0)
+        .order_by()
+    )
 
     # Sales over last 30 days
-    last_month = timezone.now() - timedelta(days=30)
-    sales_last_month = Order.objects.filter(status='delivered', created_at__gte=last_month).aggregate(sum=Sum('total_price'))['sum'] or 0
+    last_month = timezone.localdate() - timedelta(days=30)
+    sales_last_month = delivered.filter(day__gte=last_month).aggregate(sum=Sum('revenue'))['sum'] or 0
 
     # Top-selling products (by quantity)
     top_products = (
-        OrderItem.objects.values('product__name')
-        .annotate(total_sold=Sum('quantity'))
+        DailyProductSales.objects.values('product__name')
+        .annotate(total_sold=Sum('units_sold'))
         .order_by('-total_sold')[:5]
     )
 
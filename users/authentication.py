@@ -0,0 +1,147 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    # Cap on how long this process trusts an entry without asking again.
+    # Invalidations reach other processes only through the shared cache,
+    # so this bounds how stale another worker's copy can be.
+    'LOCAL_TTL': 5,
+    # Name of a Django cache to share entries between processes, or None
+    'CACHE_ALIAS': None,
+}
+
+
+class TokenCache:
+    """
+    Bounded in-process LRU of token key -> (user, token) with a TTL,
+    optionally backed by a shared Django cache. Local entries live at most
+    local_ttl seconds, since invalidation cannot reach other processes'
+    memory.
+    """
+    key_prefix = 'auth-token:'
+
+    def __init__(self, max_size=DEFAULTS['MAX_SIZE'], ttl=DEFAULTS['TTL'], cache_alias=None,
+                 local_ttl=DEFAULTS['LOCAL_TTL']):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.shared = caches[cache_alias] if cache_alias else None
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[0], entry[1]
+                self._forget(key)
+
+        if self.shared is not None:
+            cached = self.shared.get(self.key_prefix + key)
+            if cached is not None:
+                self._store(key, *cached)
+                return cached
+        return None
+
+    def set(self, key, user, token):
+        self._store(key, user, token)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, (user, token), self.ttl)
+            index_key = f'{self.key_prefix}user:{user.pk}'
+            keys = set(self.shared.get(index_key, ())) | {key}
+            self.shared.set(index_key, keys, self.ttl)
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._forget(key)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._forget(key)
+        if self.shared is not None:
+            index_key = f'{self.key_prefix}user:{user_id}'
+            keys = self.shared.get(index_key, ())
+            self.shared.delete_many([self.key_prefix + key for key in keys] + [index_key])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _store(self, key, user, token):
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = (user, token, time.monotonic() + min(self.ttl, self.local_ttl))
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._forget(next(iter(self._entries)))
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user.get(entry[0].pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user[entry[0].pk]
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        options = {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+        _token_cache = TokenCache(
+            max_size=options['MAX_SIZE'], ttl=options['TTL'], cache_alias=options['CACHE_ALIAS'],
+            local_ttl=options['LOCAL_TTL'],
+        )
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == 'TOKEN_AUTH_CACHE':
+        _token_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in TokenAuthentication that skips the Token/User query for keys
+    seen recently. Entries are evicted once a transaction deleting the token
+    or saving the user (e.g. deactivating them or changing their role)
+    commits, see users.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cached = cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(key, user, token)
+            cached = (user, token)
+        # Hand each request its own copy, _state included, so per-request
+        # state never leaks into the cached instance
+        user, token = cached
+        return copy.deepcopy(user), token
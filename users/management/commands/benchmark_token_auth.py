@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.authentication import CachedTokenAuthentication, get_token_cache
+from users.models import User
+
+class Command(BaseCommand):
+    help = 'Measures per-request authentication overhead of TokenAuthentication vs CachedTokenAuthentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Authenticated requests per backend')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        # Work on a throwaway user; everything is rolled back at the end
+        with transaction.atomic():
+            user = User.objects.create_user(username='__auth_benchmark__', role='customer')
+            token = Token.objects.create(user=user)
+            factory = APIRequestFactory()
+            get_token_cache().clear()
+
+            for backend in (TokenAuthentication(), CachedTokenAuthentication()):
+                elapsed, queries = self.run_backend(backend, factory, token.key, count)
+                self.stdout.write(
+                    f'{type(backend).__name__:<28} {elapsed / count * 1e6:8.1f} us/request '
+                    f'{queries / count:6.2f} queries/request'
+                )
+            transaction.set_rollback(True)
+        get_token_cache().clear()
+
+    def run_backend(self, backend, factory, key, count):
+        requests = [
+            Request(factory.get('/products/', HTTP_AUTHORIZATION=f'Token {key}'))
+            for _ in range(count)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for request in requests:
+                backend.authenticate(request)
+            elapsed = time.perf_counter() - started
+        return elapsed, len(queries.captured_queries)
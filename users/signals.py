@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.models import User
+from .authentication import get_token_cache
+
+# Evictions wait for the commit: evicting earlier would let a concurrent
+# request re-cache the old row for the full TTL
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: get_token_cache().invalidate_key(key))
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_user_tokens(sender, instance, **kwargs):
+    """
+    Drop cached authentications whenever a user changes, so deactivation
+    and role changes take effect on the next request
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: get_token_cache().invalidate_user(user_id))
@@ -3,6 +3,7 @@ from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from ecommerce.testing import QueryBudgetMixin
 from rest_framework.authtoken.models import Token
 
 User = get_user_model()
@@ -148,4 +149,210 @@ class AnalyticsTestCase(TestCase):
         self.assertIn('sales_last_month', stats)
         self.assertIn('top_products', stats)
         self.assertIn('top_suppliers', stats)
-        self.assertIn('low_stock_products', stats)
\ No newline at end of file
+        self.assertIn('low_stock_products', stats)
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    """Test cached token authentication and its invalidation"""
+    
+    def setUp(self):
+        from .authentication import get_token_cache
+        
+        self.cache = get_token_cache()
+        self.cache.clear()
+        self.addCleanup(self.cache.clear)
+        self.user = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+    
+    def test_second_request_skips_token_lookup(self):
+        # Token/User join, then the count for the (empty) notification list
+        with self.assertNumQueries(2):
+            self.client.get('/notifications/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/notifications/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_deactivation_and_role_change_take_effect(self):
+        self.client.get('/notifications/')
+        
+        self.user.role = 'supplier'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = self.client.get('/products/dashboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        response = self.client.get('/notifications/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_eviction_waits_for_commit(self):
+        self.client.get('/notifications/')
+        
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+            # Still uncommitted: a request re-caching now would keep the old row
+            self.assertIsNotNone(self.cache.get(self.token.key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(self.cache.get(self.token.key))
+    
+    def test_requests_get_independent_user_copies(self):
+        from .authentication import CachedTokenAuthentication
+        
+        authentication = CachedTokenAuthentication()
+        first, _ = authentication.authenticate_credentials(self.token.key)
+        second, _ = authentication.authenticate_credentials(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertIsNot(first._state, second._state)
+        self.assertIsNot(first._state.fields_cache, second._state.fields_cache)
+    
+    def test_deleted_token_is_rejected(self):
+        self.client.get('/notifications/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        response = self.client.get('/notifications/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_lru_eviction_and_ttl(self):
+        from .authentication import TokenCache
+        
+        cache = TokenCache(max_size=2, ttl=60)
+        users = [User.objects.create_user(username=f'user{i}', password='pass12345') for i in range(3)]
+        for i, user in enumerate(users[:2]):
+            cache.set(f'key{i}', user, None)
+        cache.get('key0')  # key1 is now least recently used
+        cache.set('key2', users[2], None)
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(len(cache), 2)
+        
+        cache.ttl = 0
+        cache.set('key0', users[0], None)
+        self.assertIsNone(cache.get('key0'))
+    
+    def test_local_entries_expire_before_shared_ones(self):
+        from django.core.cache import cache as shared
+        from .authentication import TokenCache
+        
+        self.addCleanup(shared.clear)
+        worker = TokenCache(ttl=300, local_ttl=0, cache_alias='default')
+        worker.set('key', self.user, None)
+        # Another process invalidated the user: only the shared copy is gone,
+        # and this worker's local copy has already lapsed
+        shared.delete(TokenCache.key_prefix + 'key')
+        self.assertIsNone(worker.get('key'))
+    
+    def test_shared_cache_invalidation(self):
+        from django.core.cache import cache as shared
+        from .authentication import TokenCache
+        
+        first = TokenCache(cache_alias='default')
+        second = TokenCache(cache_alias='default')
+        first.set('shared-key', self.user, None)
+        self.assertEqual(second.get('shared-key')[0].pk, self.user.pk)
+        
+        first.invalidate_user(self.user.pk)
+        second.clear()
+        self.assertIsNone(second.get('shared-key'))
+        shared.clear()
+
+
+class DashboardRollupTestCase(TestCase):
+    """Test the admin dashboard reads incrementally maintained rollups"""
+    
+    def setUp(self):
+        from products.models import Product, Category
+        
+        self.customer = User.objects.create_user(username='customer', password='customer123', role='customer')
+        self.supplier = User.objects.create_user(username='supplier', password='supplier123', role='supplier')
+        category = Category.objects.create(name='Electronics')
+        self.laptop = Product.objects.create(name='Laptop', category=category, price=1000, stock=10, supplier=self.supplier)
+        self.mouse = Product.objects.create(name='Mouse', category=category, price=20, stock=50, supplier=self.supplier)
+    
+    def place_order(self, *lines):
+        from orders.checkout import place_order
+        return place_order(self.customer, [{'product': p, 'quantity': q} for p, q in lines])
+    
+    def test_rollups_follow_orders_and_status_changes(self):
+        from .analytics import get_admin_dashboard_stats
+        
+        order = self.place_order((self.laptop, 1), (self.mouse, 3))
+        self.place_order((self.mouse, 2))
+        for next_status in ('confirmed', 'shipped', 'delivered'):
+            order.status = next_status
+            order.save()
+        
+        stats = get_admin_dashboard_stats()
+        self.assertEqual(stats['total_revenue'], 1060)
+        self.assertEqual(stats['sales_last_month'], 1060)
+        self.assertEqual(
+            {row['status']: row['count'] for row in stats['order_status_counts']},
+            {'pending': 1, 'delivered': 1}
+        )
+        self.assertEqual(stats['top_products'][0], {'product__name': 'Mouse', 'total_sold': 5})
+        
+        order.delete()
+        stats = get_admin_dashboard_stats()
+        self.assertEqual(stats['total_revenue'], 0)
+        self.assertEqual(stats['order_status_counts'], [{'status': 'pending', 'count': 1}])
+        self.assertEqual(stats['top_products'][0]['total_sold'], 2)
+    
+    def test_backfill_matches_incremental_rollups(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from orders.models import DailyOrderStats, DailyProductSales
+        
+        order = self.place_order((self.laptop, 2))
+        order.status = 'confirmed'
+        order.save()
+        self.place_order((self.laptop, 1), (self.mouse, 1))
+        
+        def snapshot():
+            return (
+                sorted(DailyOrderStats.objects.filter(order_count__gt=0).values_list('day', 'status', 'order_count', 'revenue')),
+                sorted(DailyProductSales.objects.values_list('day', 'product', 'units_sold', 'revenue')),
+            )
+        
+        incremental = snapshot()
+        call_command('backfill_order_rollups', stdout=StringIO())
+        self.assertEqual(snapshot(), incremental)
+
+class UserQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Test user endpoints run a fixed number of queries regardless of size"""
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.admin_user = User.objects.create_superuser(username='admin', password='adminpass123')
+        for i in range(10):
+            self.user = User.objects.create_user(username=f'user{i}', password='pass12345', role='customer')
+        self.client.force_authenticate(user=self.admin_user)
+    
+    def test_user_list_budget(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get('/users/users/')
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_user_detail_budget(self):
+        with self.assertQueryBudget(1):
+            self.client.get(f'/users/users/{self.user.id}/')
+        with self.assertQueryBudget(2):
+            self.client.patch(f'/users/users/{self.user.id}/update/', {'email': 'new@example.com'})
+        with self.assertQueryBudget(13):
+            self.client.delete(f'/users/users/{self.user.id}/delete/')
+    
+    def test_register_and_login_budget(self):
+        self.client.force_authenticate(user=None)
+        data = {'username': 'newuser', 'password': 'newpass123', 'role': 'customer'}
+        with self.assertQueryBudget(2):
+            self.client.post('/users/register/', data)
+        with self.assertQueryBudget(5):
+            response = self.client.post('/users/login/', {'username': 'newuser', 'password': 'newpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_admin_dashboard_budget(self):
+        with self.assertQueryBudget(6):
+            self.client.get('/users/dashboard/')